@@ -1,16 +1,255 @@
-import socket
 import time
-import math
+STARTUP_T0 = time.perf_counter() # Açılış sürelerinin (pencere, ilk kare) başlangıcı
+import os
+import socket
+import struct
+import sys
+import queue
+import threading
 import csv 
+import itertools
+import zlib
+from collections import deque
 import numpy as np
-import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext, filedialog
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-from matplotlib.figure import Figure
 from datetime import datetime
 
+# Arayüz modülleri (tkinter, matplotlib) yalnızca arayüz açılırken yüklenir;
+# böylece komut satırı modu ekran/GUI kütüphanesi olmadan çalışır. matplotlib
+# (~0.5 s) pencere ve kontroller ekrana geldikten sonra ayrıca yüklenir.
+tk = ttk = messagebox = scrolledtext = filedialog = None
+FigureCanvasTkAgg = NavigationToolbar2Tk = Figure = LineCollection = None
+
+def load_gui_modules():
+    global tk, ttk, messagebox, scrolledtext, filedialog
+    import tkinter as tk
+    from tkinter import ttk, messagebox, scrolledtext, filedialog
+
+def load_plot_modules():
+    global FigureCanvasTkAgg, NavigationToolbar2Tk, Figure, LineCollection
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+    from matplotlib.figure import Figure
+    from matplotlib.collections import LineCollection
+
+# --- PERFORMANS SONDALARI ---
+
+class PerfProbes:
+    """
+    Sıcak yoldaki aşamalar (socket, parse, frame, render, draw) için kayan
+    pencereli süre kaydı. Kapalıyken çağıran taraf yalnızca 'enabled'
+    bayrağını okur; ölçüm yapılmaz. İstenirse N tarama boyunca cProfile
+    kaydı alınır. Python 3.12+ cProfile'ı sys.monitoring üzerinden tüm iş
+    parçacıklarını izler ve aynı anda yalnız bir profilleyiciye izin verir:
+    orada tek ortak kayıt (_all.prof), eski sürümlerde iş parçacığı başına
+    ayrı .prof dosyası yazılır.
+    """
+    def __init__(self, window=512):
+        self.enabled = False
+        self.window = window
+        self.samples = {} # aşama -> [halka tampon, yazma sayacı]
+        self.profile_prefix = None
+        self.profile_sweeps = 0
+        self.profilers = {}
+        self.profile_lock = threading.Lock()
+        self.on_profile_done = None
+        self.on_profile_error = None
+
+    def record(self, stage, seconds):
+        entry = self.samples.get(stage)
+        if entry is None:
+            entry = self.samples[stage] = [np.zeros(self.window), 0]
+        entry[0][entry[1] % self.window] = seconds
+        entry[1] += 1
+
+    def reset(self):
+        self.samples = {}
+
+    def summary(self):
+        """{aşama: {'n', 'p50_ms', 'p95_ms', 'max_ms'}}"""
+        result = {}
+        for stage, (buf, count) in list(self.samples.items()):
+            ms = buf[:min(count, self.window)] * 1e3
+            result[stage] = {'n': count, 'p50_ms': float(np.percentile(ms, 50)),
+                             'p95_ms': float(np.percentile(ms, 95)), 'max_ms': float(ms.max())}
+        return result
+
+    def format_summary(self):
+        return "\n".join(f"{stage:<7} p50 {st['p50_ms']:7.2f}  p95 {st['p95_ms']:7.2f}  max {st['max_ms']:7.2f} ms"
+                         for stage, st in self.summary().items())
+
+    def dump(self, path):
+        import json
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'timestamp': datetime.now().isoformat(timespec='seconds'), 'stages': self.summary()}, f, indent=2)
+
+    def request_profile(self, sweeps, prefix):
+        """Sonraki N tarama için her iş parçacığında cProfile kaydı başlatır."""
+        self.profilers = {}
+        self.profile_sweeps = sweeps
+        self.profile_prefix = prefix
+
+    def profile_tick(self, role):
+        """Her tarama/çizim sonunda çağrılır; istek yoksa hemen döner."""
+        if not self.profile_prefix: return
+        key = 'all' if sys.version_info >= (3, 12) else role
+        with self.profile_lock:
+            entry = self.profilers.get(key)
+            if entry is None:
+                import cProfile
+                prof = cProfile.Profile()
+                try:
+                    prof.enable()
+                except ValueError as e: # Başka bir profilleyici zaten etkin
+                    self.profilers[key] = [None, 0, role]
+                    if self.on_profile_error:
+                        self.on_profile_error(f"Profil başlatılamadı: {e}")
+                    return
+                # Ortak kayıtta süre, kaydı başlatan rolün tikleriyle sayılır
+                self.profilers[key] = [prof, 0, role]
+                return
+            if entry[0] is None or entry[2] != role: return # Tamamlandı / başka rolün sayacı
+            entry[1] += 1
+            if entry[1] < self.profile_sweeps: return
+            prof, entry[0] = entry[0], None
+        path = f"{self.profile_prefix}_{key}.prof"
+        try:
+            prof.disable()
+            prof.dump_stats(path)
+        except (OSError, ValueError) as e:
+            if self.on_profile_error:
+                self.on_profile_error(f"Profil kaydedilemedi: {e}")
+            return
+        if self.on_profile_done:
+            self.on_profile_done(path)
+
+PROBES = PerfProbes()
+
 # --- VNA İLETİŞİM KATMANI ---
 
+RX_BUFFER_SIZE = 1 << 20 # 1 MB, gerektiğinde büyür
+CONNECT_TIMEOUT_S = 2.0
+IO_TIMEOUT_RANGE_S = (0.25, 5.0) # Gecikmeye göre ayarlanan okuma zaman aşımının sınırları
+IO_TIMEOUT_FACTOR = 10 # Zaman aşımı = gözlenen cevap gecikmesinin (EMA) bu katı
+DEAD_AFTER_TIMEOUTS = 3 # Art arda bu kadar zaman aşımında bağlantı kopmuş sayılır
+HEARTBEAT_S = 2.0 # Boşta bağlantıyı sıcak tutan yoklama aralığı
+RECONNECT_BACKOFF_S = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0) # Yeniden bağlanma denemeleri arası bekleme
+
+def _parse_bool(text):
+    return text.strip().upper() in ('TRUE', '1', 'ON')
+
+# Aynalanan ayarlar: (anahtar, SCPI başlığı, çözümleyici, değişince tarama yeniden başlar mı)
+INSTRUMENT_SETTINGS = (
+    ('mode', ':DEV:MODE', str.upper, True),
+    ('start', ':VNA:FREQ:START', float, True),
+    ('stop', ':VNA:FREQ:STOP', float, True),
+    ('points', ':VNA:ACQ:POINTS', int, True),
+    ('ifbw', ':VNA:ACQ:IFBW', float, True),
+    ('avg', ':VNA:ACQ:AVG', int, True),
+    ('sweeptype', ':VNA:SWEEPTYPE', str.upper, True),
+    ('power', ':VNA:STIM:LVL', float, True),
+    ('single', ':VNA:ACQ:SINGLE', _parse_bool, False),
+)
+
+class InstrumentState:
+    """
+    Cihaz ayarlarının istemci tarafı aynası. Bağlantıdan sonra ilk ayar
+    gönderiminde (sync) bir kez, tek yazımda sorgulanır; giden her komut aynayı günceller. diff() istenen ayarlardan
+    yalnızca gerçekten değişenlerin komutlarını üretir. Bilinmeyen (None)
+    değerler her zaman gönderilir; yeni bağlantıda ayna sıfırlanır.
+    """
+    def __init__(self):
+        self.invalidate()
+        self.sent = 0
+        self.skipped = 0
+        self.restarts_avoided = 0
+        self.restart_time_avoided = 0.0
+
+    def invalidate(self):
+        """Aynalanan her şeyi 'bilinmiyor' yapar (sayaçlar korunur)."""
+        self.values = dict.fromkeys(key for key, *_ in INSTRUMENT_SETTINGS)
+        self.running = None
+        self.traces = None # iz adı -> S-parametresi; None = bilinmiyor
+        self.synced = False # Bu bağlantıda cihazdan okundu mu
+
+    def sync(self, client):
+        """Ayna bu bağlantıda henüz okunmadıysa okur (ayar göndermeden hemen önce çağrılır)."""
+        if not self.synced:
+            self.refresh(client)
+
+    def refresh(self, client):
+        """Tüm ayarları, çalışma durumunu ve izleri tek pipeline ile okur."""
+        self.synced = True
+        queries = [f"{header}?" for _, header, _, _ in INSTRUMENT_SETTINGS]
+        queries += [":VNA:ACQ:RUN?", ":VNA:TRAC:LIST?"]
+        answers = client.query_many(queries)
+        for (key, _, parse, _), answer in zip(INSTRUMENT_SETTINGS, answers):
+            self.values[key] = self._parse(parse, answer)
+        self.running = self._parse(_parse_bool, answers[-2])
+        if answers[-1] is None or answers[-1].upper().startswith("ERROR"): return
+        names = [n.strip() for n in answers[-1].split(',') if n.strip()]
+        params = client.query_many([f":VNA:TRAC:PARAM? {n}" for n in names]) if names else []
+        self.traces = {n: (p or "").strip().upper() for n, p in zip(names, params)}
+
+    @staticmethod
+    def _parse(parse, answer):
+        if answer is None or answer.upper().startswith("ERROR"): return None
+        try:
+            return parse(answer)
+        except ValueError:
+            return None
+
+    def observe(self, line):
+        """Giden komutu aynaya işler (ayar, RUN/STOP, TRAC:NEW/PARAM)."""
+        header, _, arg = line.partition(' ')
+        header = header.upper()
+        if header.endswith('?'): return
+        if header == ':VNA:ACQ:RUN': self.running = True; return
+        if header == ':VNA:ACQ:STOP': self.running = False; return
+        if header in (':VNA:TRAC:NEW', ':VNA:TRAC:PARAM'):
+            if self.traces is None: return
+            name, _, param = arg.strip().partition(' ')
+            self.traces[name] = param.strip().upper() or self.traces.get(name, "")
+            return
+        for key, set_header, parse, _ in INSTRUMENT_SETTINGS:
+            if header == set_header:
+                self.values[key] = self._parse(parse, arg.strip())
+                return
+
+    def diff(self, desired, traces=()):
+        """
+        İstenen ayarlar (anahtar -> değer) ve izler için (gönderilecek komutlar,
+        tarama yeniden başlıyor mu, atlanan komut sayısı) döndürür.
+        """
+        cmds, restart, skipped = [], False, 0
+        for key, header, parse, restarts in INSTRUMENT_SETTINGS:
+            if key not in desired: continue
+            value = desired[key]
+            if self.values[key] is not None and self.values[key] == parse(str(value)):
+                skipped += 1
+                continue
+            if key == 'single':
+                value = "TRUE" if value else "FALSE"
+            cmds.append(f"{header} {value}")
+            restart |= restarts
+        for p in traces:
+            if self.traces is None or p not in self.traces:
+                cmds.append(f":VNA:TRAC:NEW {p}")
+            if self.traces is None or self.traces.get(p) != p:
+                cmds.append(f":VNA:TRAC:PARAM {p} {p}")
+            else:
+                skipped += 1
+        if self.running is not True or restart:
+            cmds.append(":VNA:ACQ:RUN")
+            restart = True
+        else:
+            skipped += 1
+        self.sent += len(cmds)
+        self.skipped += skipped
+        return cmds, restart, skipped
+
+    def report(self):
+        return (f"{self.sent} komut gönderildi, {self.skipped} atlandı; "
+                f"{self.restarts_avoided} tarama yeniden başlatması (~{self.restart_time_avoided*1e3:.0f} ms) önlendi")
+
 class VNAClient:
     def __init__(self, log_callback=None):
         self.sock = None
@@ -18,28 +257,166 @@ class VNAClient:
         self.port = 0
         self.log_callback = log_callback
 
+        # Bağlantı başına kalıcı alım tamponu: [rx_start:rx_end] henüz işlenmemiş baytlar
+        self.rx_buf = bytearray(RX_BUFFER_SIZE)
+        self.rx_view = memoryview(self.rx_buf)
+        self.rx_start = 0
+        self.rx_end = 0
+
+        # queue_cmd ile biriktirilen, bir sonraki yazımda gönderilecek komutlar
+        self.pending_cmds = []
+
+        # Oturum durumu: gecikme takibi, kopma tespiti, yeniden bağlanma
+        self.latency = None # İlk cevaba kadar geçen sürenin EMA'sı (s)
+        self.sent_at = None
+        self.last_io = 0.0
+        self.timeouts_in_row = 0
+        self.owed = 0 # Zaman aşımına uğramış, hâlâ gelebilecek cevap sayısı (gelince atılır)
+        self.link_lost = False
+        self.sweep_config = None # configure_sweep'in son ayarları; yeniden bağlanınca tekrar uygulanır
+        self.reconnects = 0
+        self.state = InstrumentState() # Cihaz ayar aynası; her bağlantıda yeniden okunur
+
     def log(self, msg, type="INFO"):
         if self.log_callback:
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            self.log_callback(f"[{timestamp}] [{type}] {msg}")
+            # Zaman damgasını alıcı ekler; tekrar birleştirme ham metin üzerinden yapılır
+            self.log_callback(msg, type)
         else:
             print(f"[{type}] {msg}")
 
-    def connect(self, ip, port):
+    def connect(self, ip, port, quiet=False, refresh=False):
+        """
+        Bağlanır; refresh=True ise ayar aynası hemen okunur. Aksi halde ayna ilk
+        configure_sweep'te okunur (ham soket ölçümleri ve havuz bağlantısı beklemez).
+        """
         try:
             if self.sock:
                 self.sock.close()
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.sock.settimeout(5.0) 
+            self.sock.settimeout(CONNECT_TIMEOUT_S)
             self.sock.connect((ip, int(port)))
+            self._tune_socket()
+            self.rx_start = self.rx_end = 0
+            self.pending_cmds = []
             self.ip = ip
             self.port = port
+            self.timeouts_in_row = 0
+            self.owed = 0
+            self.link_lost = False
+            self.last_io = time.monotonic()
             self.log(f"Bağlantı başarılı: {ip}:{port}", "OK")
-            return True
+            # Cihaz bağlantılar arasında ayarlarını korur ama başka istemci değiştirmiş olabilir:
+            # ayna her bağlantıda sıfırlanır ve ilk ayar gönderiminden önce yeniden okunur
+            self.state.invalidate()
+            if refresh:
+                self.state.refresh(self)
+            return not self.link_lost
         except Exception as e:
-            self.log(f"Bağlantı Hatası: {e}", "ERROR")
+            if self.sock:
+                self.sock.close()
+                self.sock = None
+            if not quiet:
+                self.log(f"Bağlantı Hatası: {e}", "ERROR")
             return False
 
+    def _tune_socket(self):
+        """Küçük SCPI komutları beklemeden gitsin (Nagle kapalı); ölü bağlantıyı çekirdek de yoklasın."""
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        for opt, value in (('TCP_KEEPIDLE', 5), ('TCP_KEEPINTVL', 1), ('TCP_KEEPCNT', 3)):
+            if hasattr(socket, opt):
+                self.sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, opt), value)
+        self.sock.settimeout(self.io_timeout())
+
+    def io_timeout(self):
+        lo, hi = IO_TIMEOUT_RANGE_S
+        if self.latency is None: return hi
+        return min(hi, max(lo, IO_TIMEOUT_FACTOR * self.latency))
+
+    def _observe_latency(self, seconds):
+        old = self.io_timeout()
+        self.latency = seconds if self.latency is None else 0.8 * self.latency + 0.2 * seconds
+        new = self.io_timeout()
+        if abs(new - old) > 0.2 * old:
+            self.sock.settimeout(new)
+
+    def mark_lost(self, reason):
+        if not self.link_lost:
+            self.log(f"Bağlantı koptu: {reason}", "WARN")
+        self.link_lost = True
+
+    def resync(self):
+        """
+        Zaman aşımından sonra eldeki ve kısa sürede gelen (yarım) cevapları
+        boşaltır. Henüz gelmemiş cevaplar 'owed' ile sayılır ve read_response
+        tarafından geldiklerinde atılır; böylece sorgu/cevap sırası kaymaz.
+        """
+        self.owed = max(0, self.owed - self.rx_buf.count(b"\n", self.rx_start, self.rx_end))
+        self.rx_start = self.rx_end = 0
+        if not self.sock: return
+        dropped = 0
+        try:
+            self.sock.settimeout(max(0.02, 2 * (self.latency or 0.01)))
+            while True:
+                n = self.sock.recv_into(self.rx_view)
+                if n == 0:
+                    self.mark_lost("Bağlantı karşı taraftan kapatıldı")
+                    break
+                dropped += n
+                self.owed = max(0, self.owed - self.rx_buf.count(b"\n", 0, n))
+        except socket.timeout:
+            pass
+        except OSError as e:
+            self.mark_lost(e)
+        if self.sock:
+            self.sock.settimeout(self.io_timeout())
+        if dropped:
+            self.log(f"Çerçeve eşitlendi: {dropped} bayt atıldı", "WARN")
+
+    def _on_read_error(self, cmd, e, unanswered=1):
+        """Okuma hatası: zaman aşımında tampon eşitlenir, kalıcı hatada bağlantı kopmuş sayılır."""
+        if isinstance(e, socket.timeout):
+            self.log(f"Sorgu zaman aşımı: {cmd}", "WARN")
+            self.owed += unanswered
+            self.timeouts_in_row += 1
+            if self.timeouts_in_row >= DEAD_AFTER_TIMEOUTS:
+                self.mark_lost(f"{self.timeouts_in_row} art arda zaman aşımı")
+            else:
+                self.resync()
+        else:
+            self.log(f"Okuma hatası: {e}", "ERROR")
+            self.mark_lost(e)
+        # Yarım kalan cevap bir sonraki sorguya karışmasın
+        self.rx_start = self.rx_end = 0
+
+    def reconnect(self, stop_event=None, reapply=True):
+        """
+        Aynı adrese yeniden bağlanır ve (reapply ise) son tarama ayarlarını
+        tekrar uygular. stop_event kurulana kadar geri çekilmeli dener.
+        """
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+        for attempt in itertools.count():
+            if stop_event is not None and stop_event.is_set(): return False
+            if self.connect(self.ip, self.port, quiet=attempt > 0):
+                self.reconnects += 1
+                if reapply and self.sweep_config:
+                    configure_sweep(self, **self.sweep_config)
+                if not self.link_lost:
+                    return True
+            delay = RECONNECT_BACKOFF_S[min(attempt, len(RECONNECT_BACKOFF_S) - 1)]
+            if stop_event is not None:
+                stop_event.wait(delay)
+            else:
+                time.sleep(delay)
+
+    def heartbeat(self):
+        """Boşta kalan bağlantıyı yoklar; cevap yoksa bağlantı kopmuş sayılır."""
+        if not self.sock or self.link_lost: return False
+        if time.monotonic() - self.last_io < HEARTBEAT_S: return True
+        return self.query("*IDN?") is not None
+
     def disconnect(self):
         if self.sock:
             try:
@@ -49,61 +426,224 @@ class VNAClient:
                 pass
             self.sock = None
 
-    def send_cmd(self, cmd):
-        if not self.sock: return
+    def queue_cmd(self, cmd):
+        """Komutu hemen göndermez; bir sonraki flush/send_cmd/sorgu ile tek yazımda gider."""
+        self.pending_cmds.append(cmd)
+
+    def flush(self):
+        return self.send_lines([])
+
+    def send_lines(self, cmds):
+        """Bekleyen komutları ve verilen komutları tek bir sendall ile gönderir."""
+        lines, self.pending_cmds = self.pending_cmds + list(cmds), []
+        if not self.sock or not lines: return False
         try:
             # SCPI komutları genellikle newline ile biter
-            self.sock.sendall((cmd + "\n").encode('ascii'))
+            self.sock.sendall(("\n".join(lines) + "\n").encode('ascii'))
+            for line in lines:
+                self.state.observe(line)
+            self.sent_at = time.perf_counter()
+            self.last_io = time.monotonic()
+            return True
         except Exception as e:
-            self.log(f"Gönderme hatası ({cmd}): {e}", "ERROR")
+            self.log(f"Gönderme hatası ({'; '.join(lines)}): {e}", "ERROR")
+            self.mark_lost(e)
+            return False
+
+    def send_cmd(self, cmd):
+        return self.send_lines([cmd])
+
+    def _make_rx_room(self):
+        """Tampon sonuna gelindiğinde artığı başa taşır, gerekirse tamponu büyütür."""
+        pending = self.rx_end - self.rx_start
+        if self.rx_start > 0:
+            self.rx_buf[:pending] = self.rx_view[self.rx_start:self.rx_end].tobytes()
+        else:
+            # Tek cevap tamponu dolduruyor: iki katına çıkar (eski görünümler geçerli kalır)
+            new_buf = bytearray(len(self.rx_buf) * 2)
+            new_buf[:pending] = self.rx_view[:pending]
+            self.rx_buf = new_buf
+            self.rx_view = memoryview(new_buf)
+        self.rx_start, self.rx_end = 0, pending
+
+    def read_response(self):
+        """
+        Bir sonraki newline ile biten cevabı alım tamponundan döndürür.
+        Dönen memoryview kopyasızdır ve bir sonraki okumaya kadar geçerlidir.
+        """
+        if not self.sock: return None
+        t0 = time.perf_counter() if PROBES.enabled else 0.0
+        scan = self.rx_start
+        while True:
+            # Dokümana göre cevaplar newline ile biter
+            nl = self.rx_buf.find(b"\n", scan, self.rx_end)
+            if nl >= 0:
+                msg_end = nl
+                if msg_end > self.rx_start and self.rx_buf[msg_end - 1] == 0x0D: # \r
+                    msg_end -= 1
+                msg = self.rx_view[self.rx_start:msg_end]
+                self.rx_start = nl + 1
+                if self.rx_start == self.rx_end:
+                    self.rx_start = self.rx_end = 0
+                if self.owed:
+                    # Zaman aşımına uğramış eski sorgunun geç gelen cevabı
+                    self.owed -= 1
+                    scan = self.rx_start
+                    continue
+                if self.sent_at is not None:
+                    # Gönderimden ilk cevaba kadar geçen süre zaman aşımını belirler
+                    self._observe_latency(time.perf_counter() - self.sent_at)
+                    self.sent_at = None
+                self.timeouts_in_row = 0
+                self.last_io = time.monotonic()
+                if PROBES.enabled:
+                    PROBES.record('socket', time.perf_counter() - t0)
+                return msg
+
+            scan = self.rx_end
+            if self.rx_end == len(self.rx_buf):
+                scan -= self.rx_start
+                self._make_rx_room()
+
+            n = self.sock.recv_into(self.rx_view[self.rx_end:])
+            if n == 0:
+                raise ConnectionError("Bağlantı karşı taraftan kapatıldı")
+            self.rx_end += n
+
+    def query_raw(self, cmd):
+        """Komutu gönderir, cevabı kopyalamadan (memoryview) döndürür."""
+        if not self.send_cmd(cmd): return None
+        try:
+            return self.read_response()
+        except Exception as e:
+            self._on_read_error(cmd, e)
+        return None
 
     def query(self, cmd):
-        self.send_cmd(cmd)
+        raw = self.query_raw(cmd)
+        if raw is None: return None
+        return bytes(raw).decode('ascii', errors='replace').strip()
+
+    def pipeline_raw(self, cmds):
+        """
+        Tüm sorguları tek yazımda gönderir, ilk cevabı beklemeden hepsi hatta olur.
+        Cevaplar sorgu sırasıyla üretilir (generator); her memoryview bir sonraki
+        cevap okunana kadar geçerlidir. Hata sonrası kalan sorgular için None döner.
+        """
+        ok = self.send_lines(cmds)
+        for i, cmd in enumerate(cmds):
+            if not ok:
+                yield None
+                continue
+            try:
+                yield self.read_response()
+                continue
+            except Exception as e:
+                # Bu ve kalan sorguların cevapları gelirse atılır, tampon eşitlenir
+                self._on_read_error(cmd, e, unanswered=len(cmds) - i)
+            ok = False
+            yield None
+
+    def query_many(self, cmds):
+        """pipeline_raw'ın metin karşılığı: cevap listesini sorgu sırasıyla döndürür."""
+        return [None if raw is None else bytes(raw).decode('ascii', errors='replace').strip()
+                for raw in self.pipeline_raw(cmds)]
+
+    def _parse_trace(self, param, raw):
+        if not raw: return None
+
         try:
-            response = ""
-            while True:
-                try:
-                    # Büyük veri paketleri için parça parça okuma
-                    part = self.sock.recv(4096).decode('ascii')
-                    response += part
-                    # Dokümana göre cevaplar newline ile biter
-                    if response.endswith("\n"):
-                        break
-                except socket.timeout:
-                    self.log(f"Sorgu zaman aşımı: {cmd}", "WARN")
-                    break
-                except Exception as e:
-                    self.log(f"Okuma hatası: {e}", "ERROR")
-                    break
-            return response.strip()
-        except:
+            t0 = time.perf_counter() if PROBES.enabled else 0.0
+            freqs, vals = parse_trace_data(raw)
+            if PROBES.enabled:
+                PROBES.record('parse', time.perf_counter() - t0)
+            if freqs.size == 0: return None
+            return freqs, vals
+        except Exception as e:
+            self.log(f"Veri işleme hatası ({param}): {e}", "ERROR")
             return None
 
     def get_trace_data(self, param):
         # PDF Referans 4.3.23: VNA:TRACE:DATA?
-        raw = self.query(f":VNA:TRAC:DATA? {param}")
-        if not raw: return []
-        
-        try:
-            # Dokümana göre veri formatı: [freq, real, imag], [freq, real, imag]...
-            clean_str = raw.replace('[', '').replace(']', '')
-            values = clean_str.split(',')
-            parsed = []
-            
-            # Veri formatı: Freq, Real, Imag (3'lü gruplar halinde)
-            for i in range(0, len(values), 3):
-                if i+2 < len(values):
-                    freq = float(values[i])
-                    real = float(values[i+1])
-                    imag = float(values[i+2])
-                    parsed.append({'freq': freq, 'val': complex(real, imag)})
-            return parsed
-        except Exception as e:
-            self.log(f"Veri işleme hatası ({param}): {e}", "ERROR")
-            return []
+        return self._parse_trace(param, self.query_raw(f":VNA:TRAC:DATA? {param}"))
+
+    def get_trace_if_changed(self, param, digest=None):
+        """
+        İzi çeker; ham cevabın özeti (uzunluk, CRC32) 'digest' ile aynıysa
+        ayrıştırmadan (digest, None) döner. Hata durumunda (None, None).
+        """
+        raw = self.query_raw(f":VNA:TRAC:DATA? {param}")
+        if raw is None: return None, None
+        new_digest = (len(raw), zlib.crc32(raw))
+        if new_digest == digest: return digest, None
+        return new_digest, self._parse_trace(param, raw)
+
+    def get_traces(self, params):
+        """Birden çok izi tek gidiş-dönüşte çeker; {param: (freqs, vals)} döndürür."""
+        t0 = time.perf_counter() if PROBES.enabled else 0.0
+        traces = {}
+        queries = [f":VNA:TRAC:DATA? {p}" for p in params]
+        # Her cevap bir sonraki okunmadan ayrıştırılır (tampon görünümü kopyasız kalır)
+        for p, raw in zip(params, self.pipeline_raw(queries)):
+            data = self._parse_trace(p, raw)
+            if data: traces[p] = data
+        if PROBES.enabled:
+            PROBES.record('frame', time.perf_counter() - t0)
+        return traces
 
 # --- YARDIMCI FONKSİYONLAR ---
 
+TRACE_PARAMS = ('S11', 'S12', 'S21', 'S22')
+
+def parse_trace_data(raw):
+    """
+    ':VNA:TRAC:DATA?' cevabını ([freq, real, imag], ...) tek seferde çözer.
+    (frekans float64 dizisi, complex128 değer dizisi) döndürür.
+    """
+    if isinstance(raw, str):
+        raw = raw.encode('ascii')
+    # Köşeli parantezler atılınca geriye düz bir virgüllü sayı listesi kalır.
+    # raw alım tamponunun bir görünümü olabilir: tampona yazılmaz, cevap bir kez
+    # kopyalanır (bytes zaten kopyadır) ve translate parantezsiz metni üretir
+    text = bytes(raw).translate(None, b'[]')
+    flat = np.fromstring(text, dtype=np.float64, sep=',')
+    n = flat.size // 3
+    triples = flat[:n * 3].reshape(n, 3)
+    freqs = np.ascontiguousarray(triples[:, 0])
+    vals = np.empty(n, dtype=np.complex128)
+    vals.real = triples[:, 1]
+    vals.imag = triples[:, 2]
+    return freqs, vals
+
+def estimate_sweep_time(points, ifbw):
+    """Nokta sayısı ve IFBW'den tek tarama süresini (s) kabaca tahmin eder."""
+    ifbw = ifbw or 1e3
+    return points * (1.0 / ifbw + POINT_OVERHEAD_S) + SWEEP_OVERHEAD_S
+
+def to_db(vals):
+    """Kompleks değerleri dB büyüklüğe çevirir (20*log10|x|)."""
+    return 20 * np.log10(np.abs(vals) + 1e-12)
+
+def decimate_minmax(y, buckets):
+    """
+    Min/max korumalı seyreltme: diziyi 'buckets' eşit parçaya böler ve her
+    parçadan en küçük ve en büyük örneğin indisini (sırayla) döndürür. Dar
+    çentikler ve rezonanslar kaybolmaz. Seyreltme gerekmiyorsa None döner.
+    """
+    n = len(y)
+    buckets = int(buckets)
+    if buckets < 1 or n <= 2 * buckets: return None
+    per = -(-n // buckets)
+    buckets = -(-n // per)
+    padded = np.empty(buckets * per, dtype=y.dtype)
+    padded[:n] = y
+    padded[n:] = y[-1]
+    blocks = padded.reshape(buckets, per)
+    base = np.arange(buckets) * per
+    i_min = np.minimum(base + np.argmin(blocks, axis=1), n - 1)
+    i_max = np.minimum(base + np.argmax(blocks, axis=1), n - 1)
+    return np.column_stack((np.minimum(i_min, i_max), np.maximum(i_min, i_max))).ravel()
+
 def parse_frequency(value_str):
     """
     Kullanıcı girdisini (örn: '100 kHz') Hz cinsinden integer'a çevirir.
@@ -119,8 +659,1523 @@ def parse_frequency(value_str):
     except:
         return None
 
+# --- TÜRETİLMİŞ ÖLÇÜMLER ---
+
+# tür -> (gösterim adı, y birimi); x ekseni TDR için ns, diğerlerinde MHz
+MEASUREMENTS = {
+    'logmag': ("Log Mag", "dB"),
+    'phase': ("Faz", "°"),
+    'gdelay': ("Grup Gecikmesi", "ns"),
+    'vswr': ("VSWR", ""),
+    'rloss': ("Dönüş Kaybı", "dB"),
+    'z_re': ("Direnç R", "Ω"),
+    'z_im': ("Reaktans X", "Ω"),
+    'y_mag': ("Admitans |Y|", "mS"),
+    'tdr_impulse': ("TDR Dürtü", ""),
+    'tdr_step': ("TDR Basamak", ""),
+}
+TDR_KAISER_BETA = 6.0 # Yan lob bastırma / çözünürlük dengesi
+TDR_OVERSAMPLE = 4 # Zaman ekseni sıklığı için sıfır doldurma katı
+
+def unwrapped_phase(vals):
+    """Açılmış (unwrap) faz, radyan."""
+    return np.unwrap(np.angle(vals))
+
+def vswr(vals):
+    mag = np.minimum(np.abs(vals), 1 - 1e-9)
+    return (1 + mag) / (1 - mag)
+
+def return_loss(vals):
+    return -to_db(vals)
+
+def impedance(vals, z0=50.0):
+    """Yansıma katsayısından giriş empedansı Z = Z0 (1+Γ)/(1-Γ)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return z0 * (1 + vals) / (1 - vals)
+
+def admittance(vals, z0=50.0):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (1 - vals) / (z0 * (1 + vals))
+
+def same_grid(freqs, cached):
+    """Önbellek anahtarı: aynı uçlar/nokta sayısı yetmez (LIN ve LOG aynı olabilir), ızgara karşılaştırılır."""
+    return cached is not None and (freqs is cached or np.array_equal(freqs, cached))
+
+class DerivedMeasurements:
+    """
+    Kompleks izlerden vektörel türetilmiş ölçümler. Frekans eksenine bağlı
+    büyüklükler (ω, düzgün ızgara, TDR penceresi, zaman ekseni) frekans
+    ızgarası değişene kadar önbellekte tutulur.
+    """
+    def __init__(self, z0=50.0, beta=TDR_KAISER_BETA):
+        self.z0 = z0
+        self.beta = beta
+        self.key = None
+        self.builds = 0
+
+    def _prepare(self, freqs):
+        if same_grid(freqs, self.key): return
+        n = freqs.size
+        self.key = freqs
+        self.builds += 1
+        self.x_mhz = freqs / 1e6
+        self.omega = 2 * np.pi * freqs
+        # TDR: alçak geçiren mod örnekleri f_k = k·df ister (harmonik ızgara). Başlangıcı
+        # df olmayan her tarama (LOG, 100 kHz'ten başlayan LIN, segmentli) bu ızgaraya
+        # aradeğerlenir; DC ve ilk örneğin altı ilk ölçümden uzatılır
+        self.df = freqs[-1] / n
+        harmonic = self.df * np.arange(1, n + 1)
+        self.grid = None if np.allclose(freqs, harmonic, rtol=1e-6) else harmonic
+        self.window = np.kaiser(2 * n, self.beta)[n:] # Yarım pencere: DC'de 1, sonda sıfıra iner
+        self.nfft = 1 << int(np.ceil(np.log2(2 * (n + 1) * TDR_OVERSAMPLE)))
+        self.impulse_scale = self.nfft / (2 * self.window.sum() - self.window[0])
+        # Ters FFT periyodu 1/df; ikinci yarı negatif zamana karşılık gelir ve atılır
+        self.t_ns = np.arange(self.nfft // 2) / (self.nfft * self.df) * 1e9
+
+    def time_domain(self, freqs, vals):
+        """(t_ns, dürtü, basamak) yanıtı; gerçek değerli, pencereli ters FFT."""
+        self._prepare(freqs)
+        if self.grid is not None:
+            vals = np.interp(self.grid, freqs, vals.real) + 1j * np.interp(self.grid, freqs, vals.imag)
+        spectrum = np.empty(vals.size + 1, dtype=np.complex128)
+        spectrum[0] = vals[0].real
+        spectrum[1:] = vals * self.window
+        impulse = np.fft.irfft(spectrum, n=self.nfft)
+        # Basamak tüm periyottan: t=0 darbesinin negatif zamandaki yarısı da toplanır
+        half = self.nfft // 2
+        step = np.cumsum(np.roll(impulse, half))[half:]
+        return self.t_ns, impulse[:half] * self.impulse_scale, step
+
+    def compute(self, kind, freqs, vals):
+        """MEASUREMENTS türlerinden birini (x, y) olarak döndürür."""
+        self._prepare(freqs)
+        if kind.startswith('tdr'):
+            t, impulse, step = self.time_domain(freqs, vals)
+            return t, impulse if kind == 'tdr_impulse' else step
+        if kind == 'logmag': y = to_db(vals)
+        elif kind == 'phase': y = np.degrees(unwrapped_phase(vals))
+        elif kind == 'gdelay': y = -np.gradient(unwrapped_phase(vals), self.omega) * 1e9 if vals.size > 1 else np.zeros(vals.size)
+        elif kind == 'vswr': y = vswr(vals)
+        elif kind == 'rloss': y = return_loss(vals)
+        elif kind == 'z_re': y = impedance(vals, self.z0).real
+        elif kind == 'z_im': y = impedance(vals, self.z0).imag
+        elif kind == 'y_mag': y = np.abs(admittance(vals, self.z0)) * 1e3
+        else: raise ValueError(f"Bilinmeyen ölçüm: {kind}")
+        return self.x_mhz, y
+
+# --- DOSYA BİÇİMLERİ (CSV / TOUCHSTONE) ---
+
+CSV_HEADER = ["Freq(Hz)", "S11_Real", "S11_Imag", "S12_Real", "S12_Imag", "S21_Real", "S21_Imag", "S22_Real", "S22_Imag"]
+CSV_CHUNK_ROWS = 100000 # Büyük dosyalarda bellekte tutulan en fazla satır
+
+TOUCHSTONE_UNITS = {'HZ': 1.0, 'KHZ': 1e3, 'MHZ': 1e6, 'GHZ': 1e9}
+S2P_ORDER = ('S11', 'S21', 'S12', 'S22') # Touchstone 2-port sütun sırası
+
+def sweep_from_data(data):
+    """latest_data sözlüğünü (freqs, {param: vals}) biçimine çevirir; eksik noktalar 0 olur."""
+    freqs, _ = data['S11']
+    traces = {}
+    for p in TRACE_PARAMS:
+        vals = np.zeros(len(freqs), dtype=np.complex128)
+        if data.get(p):
+            src = data[p][1][:len(freqs)]
+            vals[:len(src)] = src
+        traces[p] = vals
+    return freqs, traces
+
+def _sweep_to_table(freqs, traces, start=0, stop=None):
+    """[start:stop] aralığını 9 sütunlu CSV tablosu olarak döndürür."""
+    freqs = freqs[start:stop]
+    table = np.empty((len(freqs), 9))
+    table[:, 0] = freqs
+    for i, p in enumerate(TRACE_PARAMS):
+        vals = traces[p][start:stop]
+        table[:, 1 + 2*i] = vals.real
+        table[:, 2 + 2*i] = vals.imag
+    return table
+
+def _table_to_sweep(table):
+    freqs = np.ascontiguousarray(table[:, 0])
+    traces = {}
+    for i, p in enumerate(TRACE_PARAMS):
+        vals = np.empty(len(freqs), dtype=np.complex128)
+        vals.real = table[:, 1 + 2*i]
+        vals.imag = table[:, 2 + 2*i]
+        traces[p] = vals
+    return freqs, traces
+
+def _parse_csv_lines(lines):
+    try:
+        return np.loadtxt(lines, delimiter=',', usecols=range(9), ndmin=2)
+    except ValueError:
+        # Bozuk satırlar atlanır, tırnaklı alanlar (ör. tablolama programı çıktısı)
+        # csv modülüyle çözülür; yavaş yol yalnızca bu blokta çalışır
+        rows = []
+        for fields in csv.reader(lines):
+            try:
+                row = [float(v) for v in fields[:9]]
+            except ValueError:
+                continue
+            if len(row) == 9:
+                rows.append(row)
+        return np.array(rows, dtype=np.float64).reshape(-1, 9)
+
+def iter_csv_chunks(path, chunk_rows=CSV_CHUNK_ROWS):
+    """9 sütunlu CSV dosyasını en fazla chunk_rows satırlık (n, 9) bloklar halinde okur."""
+    with open(path, 'r', encoding='utf-8') as f:
+        header = next(csv.reader(f), [])
+        if len(header) < 9:
+            raise ValueError("CSV formatı geçersiz. 9 sütun bekleniyor.")
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines: break
+            yield _parse_csv_lines(lines)
+
+def read_csv_sweep(path):
+    chunks = list(iter_csv_chunks(path))
+    table = np.concatenate(chunks) if chunks else np.empty((0, 9))
+    return _table_to_sweep(table)
+
+def write_csv_sweep(path, freqs, traces, chunk_rows=CSV_CHUNK_ROWS):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write(",".join(CSV_HEADER) + "\r\n")
+        for start in range(0, len(freqs), chunk_rows):
+            table = _sweep_to_table(freqs, traces, start, start + chunk_rows)
+            np.savetxt(f, table, fmt='%.15g', delimiter=',', newline='\r\n')
+
+def read_touchstone(path):
+    """.s2p dosyasını okur (RI/MA/DB, Hz-GHz). (freqs, {param: vals}, z0) döndürür."""
+    unit, fmt, z0 = 'GHZ', 'MA', 50.0 # Touchstone varsayılanları
+    parts = []
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.split('!', 1)[0].strip()
+            if not line: continue
+            if line.startswith('#'):
+                tokens = line[1:].upper().split()
+                for i, tok in enumerate(tokens):
+                    if tok in TOUCHSTONE_UNITS: unit = tok
+                    elif tok in ('RI', 'MA', 'DB'): fmt = tok
+                    elif tok == 'R' and i + 1 < len(tokens): z0 = float(tokens[i + 1])
+                    elif tok in ('Y', 'Z', 'H', 'G'):
+                        raise ValueError(f"Desteklenmeyen Touchstone parametresi: {tok}")
+                continue
+            parts.append(line)
+
+    flat = np.fromstring(" ".join(parts), dtype=np.float64, sep=' ')
+    table = flat[:flat.size // 9 * 9].reshape(-1, 9)
+    freqs = table[:, 0] * TOUCHSTONE_UNITS[unit]
+    traces = {}
+    for i, p in enumerate(S2P_ORDER):
+        a, b = table[:, 1 + 2*i], table[:, 2 + 2*i]
+        if fmt == 'RI':
+            traces[p] = a + 1j * b
+        elif fmt == 'MA':
+            traces[p] = a * np.exp(1j * np.deg2rad(b))
+        else:
+            traces[p] = 10 ** (a / 20) * np.exp(1j * np.deg2rad(b))
+    return freqs, traces, z0
+
+def write_touchstone(path, freqs, traces, fmt='RI', unit='HZ', z0=50.0, chunk_rows=CSV_CHUNK_ROWS):
+    fmt, unit = fmt.upper(), unit.upper()
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write(f"! LibreVNA SCPI Tool - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"# {unit} S {fmt} R {z0:g}\n")
+        for start in range(0, len(freqs), chunk_rows):
+            stop = start + chunk_rows
+            table = np.empty((len(freqs[start:stop]), 9))
+            table[:, 0] = freqs[start:stop] / TOUCHSTONE_UNITS[unit]
+            for i, p in enumerate(S2P_ORDER):
+                vals = traces[p][start:stop]
+                if fmt == 'RI':
+                    a, b = vals.real, vals.imag
+                elif fmt == 'MA':
+                    a, b = np.abs(vals), np.angle(vals, deg=True)
+                else:
+                    a, b = to_db(vals), np.angle(vals, deg=True)
+                table[:, 1 + 2*i] = a
+                table[:, 2 + 2*i] = b
+            np.savetxt(f, table, fmt='%.15g', delimiter=' ')
+
+def read_sweep_file(path):
+    """Uzantıya göre CSV veya Touchstone dosyasını okur."""
+    if path.lower().endswith('.s2p'):
+        freqs, traces, _ = read_touchstone(path)
+        return freqs, traces
+    return read_csv_sweep(path)
+
+def write_sweep_file(path, freqs, traces):
+    if path.lower().endswith('.s2p'):
+        write_touchstone(path, freqs, traces)
+    else:
+        write_csv_sweep(path, freqs, traces)
+
+# --- İKİLİ TARAMA KAYDI ---
+
+REC_MAGIC = b"VNAREC1\0"
+REC_HEADER = struct.Struct('<8sII4s') # magic, nokta sayısı, parametre sayısı, dtype ('<c8 ' / '<c16')
+
+def _record_dtype(points, value_dtype):
+    # Sabit boyutlu kayıt: zaman damgası + her S-parametresi için kompleks blok
+    return np.dtype([('timestamp', '<f8')] + [(p, value_dtype, (points,)) for p in TRACE_PARAMS])
+
+class SweepRecorder:
+    """
+    Her çerçeveyi sabit boyutlu ikili kayıt olarak dosya sonuna ekler.
+    Frekans ızgarası başlıkta bir kez saklanır; '<dosya>.idx' zaman damgası indeksidir.
+    Başlık ilk çerçevede yazılır (ızgara o an belli olur).
+    """
+    def __init__(self, path, value_dtype='<c8'):
+        self.path = path
+        self.value_dtype = np.dtype(value_dtype)
+        self.file = None
+        self.index_file = None
+        self.record = None
+        self.count = 0
+
+    def _open(self, freqs):
+        points = len(freqs)
+        self.record = np.zeros(1, dtype=_record_dtype(points, self.value_dtype))
+        self.file = open(self.path, 'wb')
+        self.file.write(REC_HEADER.pack(REC_MAGIC, points, len(TRACE_PARAMS), self.value_dtype.str.ljust(4).encode('ascii')))
+        self.file.write(np.ascontiguousarray(freqs, dtype='<f8').tobytes())
+        self.index_file = open(self.path + ".idx", 'wb')
+
+    def append(self, frame):
+        freqs = frame['S11'][0]
+        if self.file is None:
+            self._open(freqs)
+        rec = self.record[0]
+        if len(freqs) != rec['S11'].shape[0]:
+            raise ValueError("Kayıt sırasında nokta sayısı değişti")
+
+        rec['timestamp'] = frame['timestamp']
+        for p in TRACE_PARAMS:
+            rec[p] = frame[p][1]
+        self.file.write(self.record.tobytes())
+        self.index_file.write(struct.pack('<d', frame['timestamp']))
+        # Oturum sürerken de dosya tekrar oynatılabilir olsun
+        self.file.flush()
+        self.index_file.flush()
+        self.count += 1
+
+    def close(self):
+        for f in (self.file, self.index_file):
+            if f: f.close()
+        self.file = self.index_file = None
+
+class SweepRecording:
+    """
+    SweepRecorder dosyasını belleğe eşleyerek (memmap) açar. Yalnızca istenen
+    taramanın sayfaları diskten okunur; kayıt tamamen belleğe yüklenmez.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic, points, nparams, dtype_code = REC_HEADER.unpack(f.read(REC_HEADER.size))
+        if magic != REC_MAGIC or nparams != len(TRACE_PARAMS):
+            raise ValueError("Geçersiz kayıt dosyası")
+
+        self.path = path
+        self.freqs = np.fromfile(path, dtype='<f8', count=points, offset=REC_HEADER.size)
+        self.dtype = _record_dtype(points, np.dtype(dtype_code.decode('ascii').strip()))
+        self.data_offset = REC_HEADER.size + 8 * points
+        self.records = None
+        self.refresh()
+
+    def refresh(self):
+        """Dosya büyüdüyse (kayıt sürüyorsa) eşlemeyi yeniler; yarım kayıtlar yok sayılır."""
+        count = (os.path.getsize(self.path) - self.data_offset) // self.dtype.itemsize
+        if count > 0:
+            self.records = np.memmap(self.path, dtype=self.dtype, mode='r', offset=self.data_offset, shape=(count,))
+        return count
+
+    def __len__(self):
+        return 0 if self.records is None else len(self.records)
+
+    def timestamps(self):
+        idx_path = self.path + ".idx"
+        if os.path.exists(idx_path):
+            return np.fromfile(idx_path, dtype='<f8')[:len(self)]
+        return np.array(self.records['timestamp']) if len(self) else np.empty(0)
+
+    def __getitem__(self, i):
+        rec = self.records[i]
+        frame = {'timestamp': float(rec['timestamp'])}
+        for p in TRACE_PARAMS:
+            frame[p] = (self.freqs, rec[p].astype(np.complex128))
+        return frame
+
+# --- TARAMA İSTATİSTİKLERİ ---
+
+STATS_PARAMS = ('S12', 'S21')
+STATS_KINDS = ('max', 'min', 'ema', 'mean', 'avg', 'std') # avg/std: tüm taramalar (Welford)
+STATS_EMA_ALPHA = 0.1
+STATS_BOXCAR = 16 # Kayan ortalama penceresi (tarama)
+
+class TraceStats:
+    """
+    Tek iz için frekans başına birikimli istatistik (dB büyüklük üzerinde):
+    max/min tutma, üstel ve kayan (boxcar) ortalama, Welford ortalama/varyans.
+    Her güncelleme O(nokta); geçmiş yalnızca boxcar penceresi kadar tutulur.
+    """
+    def __init__(self, alpha=STATS_EMA_ALPHA, window=STATS_BOXCAR):
+        self.alpha = alpha
+        self.window = window
+        self.count = 0
+
+    def _start(self, y):
+        self.count = 0
+        self.max = y.copy()
+        self.min = y.copy()
+        self.ema = y.copy()
+        self.ring = np.zeros((self.window, y.size))
+        self.box_sum = np.zeros(y.size)
+        self.avg = np.zeros(y.size)
+        self.m2 = np.zeros(y.size)
+
+    def update(self, y):
+        if self.count == 0 or y.shape != self.max.shape:
+            self._start(y)
+        else:
+            np.maximum(self.max, y, out=self.max)
+            np.minimum(self.min, y, out=self.min)
+            self.ema += self.alpha * (y - self.ema)
+
+        slot = self.count % self.window
+        if self.count >= self.window:
+            self.box_sum -= self.ring[slot]
+        self.ring[slot] = y
+        self.box_sum += y
+        if slot == self.window - 1:
+            # Toplama/çıkarma birikimli yuvarlama hatasını her pencerede sıfırla
+            self.ring.sum(axis=0, out=self.box_sum)
+
+        self.count += 1
+        delta = y - self.avg
+        self.avg += delta / self.count
+        delta *= y - self.avg
+        self.m2 += delta
+
+    def result(self):
+        """{tür: dizi} kopyaları; henüz tarama yoksa boş sözlük."""
+        if self.count == 0: return {}
+        std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.zeros_like(self.m2)
+        return {'max': self.max.copy(), 'min': self.min.copy(), 'ema': self.ema.copy(),
+                'mean': self.box_sum / min(self.count, self.window), 'avg': self.avg.copy(), 'std': std}
+
+class SweepStats:
+    """
+    İzlerin istatistiklerini toplama iş parçacığında günceller (çizimde atlanan
+    taramalar da dahil); arayüz snapshot ile kilitli kopya alır. Frekans
+    ekseni değişirse birikimler sıfırlanır.
+    """
+    def __init__(self, params=STATS_PARAMS, alpha=STATS_EMA_ALPHA, window=STATS_BOXCAR):
+        self.lock = threading.Lock()
+        self.traces = {p: TraceStats(alpha, window) for p in params}
+        self.freqs = None
+
+    @property
+    def count(self):
+        return min(t.count for t in self.traces.values())
+
+    def reset(self):
+        with self.lock:
+            for t in self.traces.values(): t.count = 0
+            self.freqs = None
+
+    def update(self, frame):
+        freqs = frame[next(iter(self.traces))][0]
+        mags = {p: to_db(frame[p][1]) for p in self.traces}
+        with self.lock:
+            if self.freqs is None or self.freqs.shape != freqs.shape or \
+                    self.freqs[0] != freqs[0] or self.freqs[-1] != freqs[-1]:
+                for t in self.traces.values(): t.count = 0
+                self.freqs = freqs
+            for p, y in mags.items():
+                self.traces[p].update(y)
+
+    def snapshot(self):
+        """(freqs, {param: {tür: dizi}}); henüz tarama yoksa (None, {})."""
+        with self.lock:
+            if self.freqs is None: return None, {}
+            return self.freqs, {p: t.result() for p, t in self.traces.items()}
+
+def write_stats_csv(path, freqs, results):
+    """İstatistikleri 'Freq(Hz), S21_max, ...' sütunlarıyla CSV olarak yazar."""
+    header, columns = ["Freq(Hz)"], [freqs]
+    for p, kinds in results.items():
+        for kind in STATS_KINDS:
+            header.append(f"{p}_{kind}")
+            columns.append(kinds[kind])
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write(",".join(header) + "\r\n")
+        np.savetxt(f, np.column_stack(columns), fmt='%.10g', delimiter=',', newline='\r\n')
+
+# --- İŞARETÇİLER VE LİMİT ÇİZGİLERİ ---
+
+BW_DROP_DB = 3.0 # Bant genişliği işaretçisi için tepe noktasından düşüş
+
+class TestPlan:
+    """
+    Üretim testi için işaretçiler ve limit çizgileri. Tanım dosyası satırları
+    (virgülle ayrılmış, '#' yorum):
+        LIMIT, S21, UPPER|LOWER, f1, f2, dB1, dB2   (parçalı doğrusal maske)
+        MARKER, S21, PEAK|MIN [, f1, f2]            (aralıkta tepe/çukur)
+        MARKER, S21, FREQ, f                        (sabit frekans, aradeğerli)
+        MARKER, S21, BW [, f1, f2]                  (tepe etrafında -3 dB bant)
+    prepare() frekans ızgarasına indis haritalarını kurar; ızgara aynı kaldıkça
+    her tarama yalnızca vektörel karşılaştırmalarla değerlendirilir.
+    """
+    def __init__(self, limits=(), markers=()):
+        self.limits = list(limits) # (param, 'UPPER'/'LOWER', f1, f2, db1, db2)
+        self.markers = list(markers) # (param, tür, argümanlar)
+        self.key = None
+        self.builds = 0
+
+    @classmethod
+    def from_lines(cls, lines):
+        limits, markers = [], []
+        for n, line in enumerate(lines, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line: continue
+            fields = [f.strip() for f in line.split(',')]
+            head = fields[0].upper()
+            param = fields[1].upper() if len(fields) > 1 else None
+            if param not in TRACE_PARAMS:
+                raise ValueError(f"Satır {n}: geçersiz S-parametresi")
+            kind = fields[2].upper() if len(fields) > 2 else None
+            freqs = [parse_frequency(f) for f in fields[3:]]
+            if head == 'LIMIT' and kind in ('UPPER', 'LOWER') and len(fields) == 7:
+                f1, f2 = freqs[:2]
+                if f1 is None or f2 is None or f2 < f1:
+                    raise ValueError(f"Satır {n}: geçersiz frekans aralığı")
+                limits.append((param, kind, f1, f2, float(fields[5]), float(fields[6])))
+            elif head == 'MARKER' and kind in ('PEAK', 'MIN', 'BW') and len(fields) in (3, 5):
+                span = tuple(freqs) if len(fields) == 5 else None
+                if span and (None in span or span[1] < span[0]):
+                    raise ValueError(f"Satır {n}: geçersiz frekans aralığı")
+                markers.append((param, kind, span))
+            elif head == 'MARKER' and kind == 'FREQ' and len(fields) == 4 and freqs[0] is not None:
+                markers.append((param, kind, freqs[0]))
+            else:
+                raise ValueError(f"Satır {n}: tanınmayan tanım: {line}")
+        return cls(limits, markers)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_lines(f)
+
+    def _span(self, freqs, span):
+        """Aralığın indis dilimi; tarama aralığıyla kesişmiyorsa boş dilim."""
+        if span is None: return slice(None)
+        if span[1] < freqs[0] or span[0] > freqs[-1]: return slice(0, 0)
+        i0 = int(np.searchsorted(freqs, span[0], 'left'))
+        i1 = int(np.searchsorted(freqs, span[1], 'right'))
+        return slice(i0, max(i1, i0 + 1))
+
+    def prepare(self, freqs):
+        """İndis haritalarını yalnızca frekans ızgarası değişince yeniden kurar."""
+        if same_grid(freqs, self.key): return
+        self.key = freqs
+        self.builds += 1
+        self.freqs = freqs
+
+        # (param, tür) başına tüm parçaların indisleri ve o noktalardaki limit değerleri
+        masks = {}
+        for param, kind, f1, f2, db1, db2 in self.limits:
+            idx = np.flatnonzero((freqs >= f1) & (freqs <= f2))
+            lim = np.interp(freqs[idx], [f1, f2], [db1, db2]) if f2 > f1 else np.full(idx.size, db1)
+            entry = masks.setdefault((param, kind), ([], []))
+            entry[0].append(idx); entry[1].append(lim)
+        self.limit_maps = [(param, kind, np.concatenate(idx), np.concatenate(lim))
+                           for (param, kind), (idx, lim) in masks.items()]
+
+        self.marker_maps = []
+        for param, kind, arg in self.markers:
+            if kind == 'FREQ':
+                if not freqs[0] <= arg <= freqs[-1]:
+                    # Tarama dışında: uç değer yerine NaN raporlanır
+                    self.marker_maps.append((param, kind, (None, None, None, arg)))
+                    continue
+                # Komşu iki nokta ve doğrusal ağırlık
+                i = int(np.clip(np.searchsorted(freqs, arg) - 1, 0, max(freqs.size - 2, 0)))
+                j = min(i + 1, freqs.size - 1)
+                w = 0.0 if j == i else float(np.clip((arg - freqs[i]) / (freqs[j] - freqs[i]), 0.0, 1.0))
+                self.marker_maps.append((param, kind, (i, j, w, arg)))
+            else:
+                self.marker_maps.append((param, kind, self._span(freqs, arg)))
+
+    def _bandwidth(self, freqs, y):
+        """Tepe etrafında BW_DROP_DB düşüş noktaları: (merkez, bant genişliği); bulunamazsa nan."""
+        pk = int(np.argmax(y))
+        thr = y[pk] - BW_DROP_DB
+        left = np.flatnonzero(y[:pk] < thr)
+        right = np.flatnonzero(y[pk:] < thr)
+        if not left.size or not right.size: return float(freqs[pk]), float('nan')
+        i, j = left[-1], pk + right[0]
+        f_lo = np.interp(thr, [y[i], y[i + 1]], [freqs[i], freqs[i + 1]])
+        f_hi = np.interp(-thr, [-y[j - 1], -y[j]], [freqs[j - 1], freqs[j]])
+        return float((f_lo + f_hi) / 2), float(f_hi - f_lo)
+
+    def evaluate(self, frame):
+        """
+        {'pass': bool, 'markers': [(etiket, f_Hz, değer, birim)],
+         'fails': [(param, tür, en kötü f_Hz, aşım dB)]}
+        """
+        freqs = frame[TRACE_PARAMS[0]][0]
+        self.prepare(freqs)
+        mags = {}
+        def mag(param):
+            if param not in mags: mags[param] = to_db(frame[param][1])
+            return mags[param]
+
+        fails = []
+        for param, kind, idx, lim in self.limit_maps:
+            if not idx.size: continue
+            excess = (mag(param)[idx] - lim) if kind == 'UPPER' else (lim - mag(param)[idx])
+            worst = int(np.argmax(excess))
+            if excess[worst] > 0:
+                fails.append((param, kind, float(freqs[idx[worst]]), float(excess[worst])))
+
+        markers = []
+        for param, kind, m in self.marker_maps:
+            if kind == 'FREQ':
+                i, j, w, f = m
+                if i is None:
+                    markers.append((f"{param} Freq", f, float('nan'), "dB"))
+                    continue
+                vals = frame[param][1]
+                markers.append((f"{param} Freq", f, float(to_db((1 - w) * vals[i] + w * vals[j])), "dB"))
+                continue
+            y, f = mag(param)[m], freqs[m]
+            if not y.size:
+                # Aralık tarama dışında kaldı
+                label = f"{param} BW-{BW_DROP_DB:g}dB" if kind == 'BW' else f"{param} {kind.capitalize()}"
+                markers.append((label, float('nan'), float('nan'), "Hz" if kind == 'BW' else "dB"))
+                continue
+            if kind == 'BW':
+                center, bw = self._bandwidth(f, y)
+                markers.append((f"{param} BW-{BW_DROP_DB:g}dB", center, bw, "Hz"))
+            else:
+                i = int(np.argmax(y) if kind == 'PEAK' else np.argmin(y))
+                markers.append((f"{param} {kind.capitalize()}", float(f[i]), float(y[i]), "dB"))
+        return {'pass': not fails, 'markers': markers, 'fails': fails}
+
+def format_test_result(result):
+    lines = ["GEÇTİ" if result['pass'] else "KALDI"]
+    for label, f, value, unit in result['markers']:
+        if np.isnan(value) and (np.isnan(f) or unit == "dB"):
+            lines.append(f"{label}: tarama aralığı dışında")
+        elif unit == "Hz":
+            lines.append(f"{label}: {value/1e6:.3f} MHz (merkez {f/1e6:.3f} MHz)")
+        else:
+            lines.append(f"{label}: {value:.2f} {unit} @ {f/1e6:.3f} MHz")
+    for param, kind, f, excess in result['fails']:
+        lines.append(f"{param} {kind} aşıldı: {excess:.2f} dB @ {f/1e6:.3f} MHz")
+    return "\n".join(lines)
+
+class TestSession:
+    """
+    TestPlan'ı her taramada (toplama iş parçacığında) çalıştırır, geçti/kaldı
+    sayar ve isteğe bağlı olarak sonuçları satır satır CSV günlüğüne yazar.
+    """
+    def __init__(self, plan, log_path=None):
+        self.plan = plan
+        self.passed = 0
+        self.failed = 0
+        self.log = None
+        if log_path:
+            self.log = open(log_path, 'w', newline='', encoding='utf-8', buffering=1)
+            header = ["Timestamp", "Sweep", "Result"] + [f"{p}_{k}" for p, k, _ in plan.markers] + ["Failures"]
+            self.log.write(",".join(header) + "\r\n")
+
+    def check(self, frame):
+        result = self.plan.evaluate(frame)
+        if result['pass']: self.passed += 1
+        else: self.failed += 1
+        if self.log:
+            stamp = datetime.fromtimestamp(frame.get('timestamp', time.time())).isoformat(timespec='milliseconds')
+            row = [stamp, str(self.passed + self.failed), "PASS" if result['pass'] else "FAIL"]
+            row += ['%.6g' % value for _, _, value, _ in result['markers']]
+            row.append(" ".join(f"{p}:{k}@{f:.0f}:{e:.2f}" for p, k, f, e in result['fails']))
+            self.log.write(",".join(row) + "\r\n")
+        return result
+
+    def close(self):
+        if self.log:
+            self.log.close()
+            self.log = None
+
+# --- ARKA PLAN VERİ TOPLAMA ---
+
+def configure_sweep(client, start, stop, points, ifbw=None, avg=1, sweep_type="LIN", power=0.0):
+    """
+    Tarama ayarlarını uygular, sürekli taramayı başlatır ve S11..S22 izlerini
+    hazırlar. Cihaz aynasına göre yalnızca değişen ayarlar gönderilir.
+    """
+    client.sweep_config = dict(start=start, stop=stop, points=points, ifbw=ifbw, avg=avg, sweep_type=sweep_type, power=power)
+    desired = {'mode': "VNA", 'start': start, 'stop': stop, 'points': points}
+
+    # Hassasiyet ve ortalama
+    if ifbw:
+        desired['ifbw'] = ifbw
+    if avg >= 1:
+        desired['avg'] = avg
+
+    # Tarama tipi ve çıkış gücü (PDF 4.3.10 ve 4.3.20), sürekli tarama
+    desired.update(sweeptype=sweep_type, power=power, single=False)
+
+    state = client.state
+    state.sync(client)
+    cmds, restart, skipped = state.diff(desired, TRACE_PARAMS)
+    if not restart:
+        # Ayarlar aynı: tarama ve ortalama baştan alınmıyor
+        state.restarts_avoided += 1
+        state.restart_time_avoided += estimate_sweep_time(points, ifbw or 1e3) * max(avg, 1)
+    client.log(f"Ayarlar: {len(cmds)} komut gönderildi, {skipped} değişmediği için atlandı", "CMD")
+    for cmd in cmds:
+        client.queue_cmd(cmd)
+    return client.flush() if cmds else True
+
+class FrameMailbox:
+    """
+    Tek yuvalı 'en son çerçeve' kutusu. Yeni çerçeve okunmamış eskisinin
+    üzerine yazılır; böylece okuyucu her zaman en güncel taramayı alır.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+        self.published = 0
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._lock:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self.published += 1
+
+    def take(self):
+        with self._lock:
+            frame, self._frame = self._frame, None
+            return frame
+
+POINT_OVERHEAD_S = 50e-6 # Nokta başına sentez/yerleşme payı (tahmini)
+SWEEP_OVERHEAD_S = 0.01 # Tarama başına sabit pay (tahmini)
+
+class SweepScheduler:
+    """
+    Tarama süresini nokta sayısı ve IFBW'den tahmin eder, gözlenen tamamlanma
+    aralıklarıyla düzeltir. Çekimler yalnızca yeni bir tarama beklendiğinde yapılır;
+    değişmemiş veri dönen çekimler 'boşa' sayılır.
+    """
+    def __init__(self, points, ifbw):
+        self.estimate = estimate_sweep_time(points, ifbw)
+        self.last_new = None # Son yeni taramanın görüldüğü an (monotonic)
+        self.new_sweeps = 0
+        self.wasted = 0
+        self.stale_since_new = 0
+        self.stamps = deque(maxlen=20)
+
+    def delay(self):
+        """Bir sonraki çekime kadar beklenecek süre (s)."""
+        if self.last_new is None: return 0.0
+        # Tahminin biraz öncesinde yoklamaya başla, sonra kısa adımlarla tekrarla
+        return max(0.0, self.last_new + 0.9 * self.estimate - time.monotonic())
+
+    def retry_delay(self):
+        return max(0.005, 0.1 * self.estimate)
+
+    def on_new_sweep(self, now=None):
+        """now: yeni verinin istendiği an (monotonic); indirme süresi aralığa karışmaz."""
+        now = time.monotonic() if now is None else now
+        if self.last_new is not None:
+            observed = now - self.last_new
+            # Araya boşa çekim girdiyse gözlenen aralık gerçek tarama süresine yakındır.
+            # İlk denemede gelen yeni veri yalnızca aralık tahminden kısaysa tahmini
+            # (yavaşça) küçültür; aksi halde tahmin salınır ve boşa çekim artar
+            if self.stale_since_new or observed < self.estimate:
+                self.estimate += 0.3 * (observed - self.estimate)
+        self.last_new = now
+        self.stale_since_new = 0
+        self.new_sweeps += 1
+        self.stamps.append(now)
+
+    def on_stale_fetch(self):
+        self.wasted += 1
+        self.stale_since_new += 1
+
+    def sweeps_per_second(self):
+        if len(self.stamps) < 2: return 0.0
+        span = self.stamps[-1] - self.stamps[0]
+        return (len(self.stamps) - 1) / span if span > 0 else 0.0
+
+SEGMENT_SWITCH_S = 0.02 # Segment başına ayar + tetikleme payı (tahmini)
+SEGMENT_FIN_TIMEOUT = 3.0 # Tahmini sürenin bu katında bitmeyen segment iptal edilir
+SEGMENT_FREQ_TOL = 0.5 # Hz; bu kadar yakın noktalar aynı frekans sayılır
+
+class SegmentPlan:
+    """
+    Segmentli tarama. Tanım dosyasının her satırı bir frekans aralığıdır
+    (virgülle ayrılmış, '#' yorum):
+        start, stop, points, ifbw [, güç dBm]
+    Segmentler ardışık tekil taramalar olarak çekilir ve frekansa göre sıralı,
+    tekrarsız tek bir taramaya birleştirilir. Aynı frekans birden çok segmentte
+    varsa düşük IFBW'li ölçüm tutulur. Birleştirme indis haritası ızgara
+    değişmedikçe yeniden kurulmaz.
+    """
+    def __init__(self, segments, avg=1, sweep_type="LIN", power=0.0):
+        self.segments = list(segments) # (start, stop, points, ifbw, güç ya da None)
+        self.avg = avg
+        self.sweep_type = sweep_type
+        self.power = power # Gücü verilmemiş segmentler için
+        self.key = None
+        self.builds = 0
+
+    @classmethod
+    def from_lines(cls, lines):
+        segments = []
+        for n, line in enumerate(lines, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line: continue
+            fields = [f.strip() for f in line.split(',')]
+            if len(fields) not in (4, 5):
+                raise ValueError(f"Satır {n}: 'start, stop, points, ifbw [, güç]' bekleniyor")
+            start, stop, ifbw = parse_frequency(fields[0]), parse_frequency(fields[1]), parse_frequency(fields[3])
+            try:
+                points = int(fields[2])
+                power = float(fields[4]) if len(fields) == 5 else None
+            except ValueError:
+                raise ValueError(f"Satır {n}: geçersiz nokta sayısı/güç")
+            if start is None or stop is None or stop <= start:
+                raise ValueError(f"Satır {n}: geçersiz frekans aralığı")
+            if points < 2 or not ifbw or ifbw <= 0:
+                raise ValueError(f"Satır {n}: nokta sayısı >= 2 ve IFBW > 0 olmalı")
+            segments.append((start, stop, points, ifbw, power))
+        if not segments:
+            raise ValueError("Segment tanımı boş")
+        return cls(segments)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_lines(f)
+
+    @property
+    def start(self):
+        return min(seg[0] for seg in self.segments)
+
+    @property
+    def stop(self):
+        return max(seg[1] for seg in self.segments)
+
+    def nominal_points(self):
+        """Birleştirilmiş taramadaki (tekrarsız) nokta sayısı."""
+        space = np.geomspace if self.sweep_type == "LOG" else np.linspace
+        grid = np.sort(np.concatenate([space(start, stop, points) for start, stop, points, _, _ in self.segments]))
+        return int(np.count_nonzero(np.diff(grid) > SEGMENT_FREQ_TOL)) + 1
+
+    def estimate_time(self):
+        """Bir birleşik taramanın tahmini süresi (s)."""
+        return sum(estimate_sweep_time(points, ifbw) * max(self.avg, 1) + SEGMENT_SWITCH_S
+                   for _, _, points, ifbw, _ in self.segments)
+
+    def single_sweep_equivalent(self):
+        """En ince adım ve en düşük IFBW ile tüm aralığı tek taramada çekmek: (nokta, IFBW, süre)."""
+        step = min((stop - start) / (points - 1) for start, stop, points, _, _ in self.segments)
+        ifbw = min(seg[3] for seg in self.segments)
+        points = int(np.ceil((self.stop - self.start) / step)) + 1
+        return points, ifbw, estimate_sweep_time(points, ifbw) * max(self.avg, 1)
+
+    def report(self):
+        t = self.estimate_time()
+        points, ifbw, t_single = self.single_sweep_equivalent()
+        return (f"{len(self.segments)} segment, {self.nominal_points()} nokta: tahmini {t*1e3:.0f} ms/tarama; "
+                f"aynı çözünürlükte tek tarama ({points} nokta, IFBW {ifbw:g} Hz) {t_single*1e3:.0f} ms "
+                f"({t_single / t:.1f}x)")
+
+    def make_scheduler(self):
+        # Yalnızca hız/sayaç için; segmentli çekim kendi bitişini bekler
+        scheduler = SweepScheduler(self.nominal_points(), min(seg[3] for seg in self.segments))
+        scheduler.estimate = self.estimate_time()
+        return scheduler
+
+    def prepare(self, parts):
+        """Segment ızgaraları değişince sıralama + tekrar eleme indislerini yeniden kurar."""
+        grids = [part['S21'][0] for part in parts]
+        if self.key is not None and len(grids) == len(self.key) and all(map(same_grid, grids, self.key)): return
+        self.key = grids
+        self.builds += 1
+        freqs = np.concatenate([part['S21'][0] for part in parts])
+        ifbw = np.concatenate([np.full(part['S21'][0].size, seg[3]) for part, seg in zip(parts, self.segments)])
+        order = np.lexsort((ifbw, freqs)) # Frekans, eşitlikte düşük IFBW önce
+        f_sorted = freqs[order]
+        keep = np.ones(order.size, dtype=bool)
+        keep[1:] = np.diff(f_sorted) > SEGMENT_FREQ_TOL
+        self.index = order[keep]
+        self.freqs = f_sorted[keep]
+
+    def stitch(self, parts):
+        """Segment çerçevelerini ({param: (freqs, vals)} listesi) tek çerçeveye birleştirir."""
+        self.prepare(parts)
+        return {p: (self.freqs, np.concatenate([part[p][1] for part in parts])[self.index]) for p in TRACE_PARAMS}
+
+    def acquire(self, client, stop_event):
+        """
+        Segmentleri sırayla tekil tarama olarak çeker ve birleştirir. Durdurulur,
+        bağlantı koparsa ya da segment zamanında bitmezse {} döner.
+        """
+        parts = []
+        for start, stop, points, ifbw, power in self.segments:
+            desired = {'mode': "VNA", 'start': start, 'stop': stop, 'points': points, 'ifbw': ifbw,
+                       'avg': self.avg, 'sweeptype': self.sweep_type,
+                       'power': self.power if power is None else power, 'single': True}
+            client.state.sync(client)
+            cmds, _, _ = client.state.diff(desired, TRACE_PARAMS)
+            if ":VNA:ACQ:RUN" not in cmds:
+                cmds.append(":VNA:ACQ:RUN") # Ayarlar aynı olsa da yeni tekil tarama tetiklenir
+            if not client.send_lines(cmds): return {}
+
+            estimate = estimate_sweep_time(points, ifbw) * max(self.avg, 1)
+            if stop_event.wait(0.9 * estimate): return {}
+            deadline = time.monotonic() + SEGMENT_FIN_TIMEOUT * estimate + 1.0
+            while True:
+                done = client.query(":VNA:ACQ:FIN?")
+                if done is None: return {}
+                if done.upper() == "TRUE": break
+                if time.monotonic() > deadline:
+                    client.log(f"Segment {start/1e6:g}-{stop/1e6:g} MHz zamanında bitmedi", "WARN")
+                    return {}
+                if stop_event.wait(max(0.005, 0.1 * estimate)): return {}
+
+            frame = client.get_traces(TRACE_PARAMS)
+            if len(frame) != len(TRACE_PARAMS): return {}
+            parts.append(frame)
+        return self.stitch(parts)
+
+class AcquisitionWorker(threading.Thread):
+    """
+    VNAClient'ı sahiplenip taramaları arka planda çeken iş parçacığı.
+    Her tam çerçeve (4 S-parametresi + zaman damgası) mailbox'a yazılır.
+    mailbox olmadan, iş parçacığı başlatılmadan next_frame ile de kullanılabilir.
+    segments (SegmentPlan) verilirse her çerçeve birleştirilmiş segmentli taramadır.
+    setup(client) verilirse bağlanma/ayarlama ilk taramadan önce bu iş parçacığında yapılır.
+    """
+    def __init__(self, client, mailbox, scheduler=None, recorder=None, stats=None, tester=None, keep_connection=False,
+                 segments=None, setup=None):
+        super().__init__(daemon=True)
+        self.client = client
+        self.mailbox = mailbox
+        self.scheduler = scheduler
+        self.segments = segments
+        self.setup = setup
+        self.recorder = recorder
+        self.stats = stats
+        self.tester = tester
+        self.tester_lock = threading.Lock()
+        self.next_tester = None # set_tester ile verilen, henüz devralınmamış oturum
+        self.tester_pending = False
+        self.finished = False # shutdown sonrası gelen oturum beklemeden kapatılır
+        self.keep_connection = keep_connection # Durdurulunca bağlantı açık kalır (SessionKeeper devralır)
+        self.stop_event = threading.Event()
+        self.last_digest = None # Son yeni taramanın S21 ham cevap özeti
+        self.requested_at = None # Son S21 isteğinin zamanı (monotonic)
+        self.lost_at = None # Bağlantının koptuğu an; ilk yeni taramaya kadar
+        self.recovery_times = [] # Kopmadan ilk yeni taramaya kadar geçen süreler (s)
+        self.error = None # İş parçacığını sonlandıran beklenmedik hata (arayüz okur)
+
+    def stop(self):
+        self.stop_event.set()
+
+    def set_tester(self, tester):
+        """Test oturumunu değiştirir; değişimi bir sonraki taramadan önce bu iş parçacığı yapar, eskisini kapatır."""
+        with self.tester_lock:
+            if not self.finished:
+                if self.tester_pending and self.next_tester:
+                    self.next_tester.close() # Hiç kullanılmadan yerine yenisi geldi
+                self.next_tester, self.tester_pending = tester, True
+                return
+        if tester:
+            tester.close()
+
+    def take_tester(self):
+        with self.tester_lock:
+            if not self.tester_pending: return
+            tester, self.next_tester, self.tester_pending = self.next_tester, None, False
+        self.close_tester()
+        self.tester = tester
+
+    def close_tester(self):
+        if self.tester:
+            self.tester.close()
+            self.client.log(f"Test sonuçları: {self.tester.passed} geçti, {self.tester.failed} kaldı", "INFO")
+
+    def fetch_frame(self):
+        """
+        Tam çerçeveyi çeker; eksikse eksik sözlük döner. Zamanlayıcı varsa önce
+        yalnızca S21 istenir: ham cevap önceki taramayla aynıysa (tarama henüz
+        bitmemiş) kalan üç iz indirilmez ve None döner.
+        """
+        if not self.scheduler:
+            # Dört ':VNA:TRAC:DATA?' sorgusu tek yazımda (1 RTT)
+            return self.client.get_traces(TRACE_PARAMS)
+        self.requested_at = time.monotonic()
+        digest, s21 = self.client.get_trace_if_changed('S21', self.last_digest)
+        if digest is not None and digest == self.last_digest:
+            self.scheduler.on_stale_fetch()
+            return None
+        if s21 is None: return {}
+        rest = self.client.get_traces([p for p in TRACE_PARAMS if p != 'S21'])
+        rest['S21'] = s21
+        frame = {p: rest[p] for p in TRACE_PARAMS if p in rest}
+        if len(frame) == len(TRACE_PARAMS):
+            self.last_digest = digest
+        return frame
+
+    def record(self, frame):
+        try:
+            self.recorder.append(frame)
+        except Exception as e:
+            self.client.log(f"Kayıt hatası: {e}", "ERROR")
+            self.recorder.close()
+            self.recorder = None
+
+    def next_frame(self):
+        """
+        Bir sonraki yeni ve tam çerçeveyi bekleyip döndürür; durdurulursa None
+        döner. Bağlantı koparsa yeniden bağlanıp son ayarları uygular ve akışa
+        devam eder. Komut satırı modu bunu doğrudan çağırır.
+        """
+        while not self.stop_event.is_set():
+            if self.client.link_lost or not self.client.sock:
+                # Şeffaf yeniden bağlanma: aynı adres, son ayarlar yeniden uygulanır
+                if not self.client.ip: break
+                if self.lost_at is None:
+                    self.lost_at = time.perf_counter()
+                if not self.client.reconnect(self.stop_event): break
+                self.last_digest = None
+                continue
+
+            if self.segments:
+                # Segmentli çekim her segmentin bitişini kendisi bekler
+                frame = self.segments.acquire(self.client, self.stop_event)
+            else:
+                # Yeni tarama beklenmiyorsa cihazı boşuna sorgulama
+                if self.scheduler and self.stop_event.wait(self.scheduler.delay()):
+                    break
+                frame = self.fetch_frame()
+                if frame is None:
+                    # Aynı tarama (yalnızca S21 indirildi): kısa bir süre sonra yeniden dene
+                    self.stop_event.wait(self.scheduler.retry_delay())
+                    continue
+            if len(frame) == len(TRACE_PARAMS):
+                if self.scheduler:
+                    self.scheduler.on_new_sweep(None if self.segments else self.requested_at)
+                frame['timestamp'] = time.time()
+                # Kayıt burada: çizimde atlanan taramalar da diske yazılır
+                if self.recorder:
+                    self.record(frame)
+                if self.stats:
+                    self.stats.update(frame)
+                self.take_tester()
+                if self.tester:
+                    frame['test'] = self.tester.check(frame)
+                if self.lost_at is not None:
+                    recovery = time.perf_counter() - self.lost_at
+                    self.recovery_times.append(recovery)
+                    self.lost_at = None
+                    self.client.log(f"Akış sürüyor: kopmadan ilk taramaya {recovery*1e3:.0f} ms", "OK")
+                PROBES.profile_tick('acq')
+                return frame
+            if self.client.link_lost: continue
+            # Eksik çerçeve: cihazı meşgul etmemek için kısa bekle
+            self.stop_event.wait(0.05)
+        return None
+
+    def shutdown(self):
+        if self.recorder:
+            self.recorder.close()
+            self.client.log(f"Kayıt kapatıldı: {self.recorder.count} tarama", "FILE")
+        with self.tester_lock:
+            self.finished = True
+        self.take_tester()
+        self.close_tester()
+
+        # Bağlantı bu iş parçacığına ait; kapatma da burada yapılır
+        if self.client.sock:
+            self.client.send_cmd(":VNA:ACQ:STOP")
+        if not self.keep_connection:
+            self.client.disconnect()
+
+    def run(self):
+        try:
+            if self.setup:
+                # Yanıtsız cihazda bağlanma/ayar sorguları arayüzü değil bu iş parçacığını bekletir
+                self.setup(self.client)
+            while True:
+                frame = self.next_frame()
+                if frame is None: break
+                self.mailbox.put(frame)
+        except Exception as e:
+            self.error = e
+            self.client.log(f"Veri toplama durdu: {type(e).__name__}: {e}", "ERROR")
+        finally:
+            # Kayıt kapatılır, ACQ:STOP gönderilir; hata olsa da
+            self.shutdown()
+
+class SessionKeeper(threading.Thread):
+    """
+    Akış dururken bağlantıyı sıcak tutar: boşta HEARTBEAT_S aralıkla yoklar,
+    kopmuşsa ayarları uygulamadan yeniden bağlanır. Önce bağlantıyı elinde
+    tutan iş parçacığının (after) bitmesini bekler.
+    """
+    def __init__(self, client, after=None):
+        super().__init__(daemon=True)
+        self.client = client
+        self.after = after
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        # Bağlantıyı tutan iş parçacığı beklenirken durdurulursa hemen çıkılır
+        while self.after and self.after.is_alive():
+            if self.stop_event.is_set(): return
+            self.after.join(0.1)
+        while not self.stop_event.wait(HEARTBEAT_S / 2):
+            if not self.client.ip: break
+            if self.client.link_lost or not self.client.heartbeat():
+                self.client.mark_lost("Yoklama cevapsız")
+                self.client.reconnect(self.stop_event, reapply=False)
+
+# --- ÇOKLU CİHAZ HAVUZU ---
+
+DEFAULT_PORT = 19542
+
+def parse_endpoint(text, default_port=DEFAULT_PORT):
+    """'ip[:port]' metnini (ip, port) ikilisine çevirir."""
+    host, _, port = text.strip().rpartition(':')
+    if not host:
+        return text.strip(), default_port
+    return host, int(port)
+
+class _PoolSink:
+    # AcquisitionWorker için mailbox yerine geçer: çerçeveyi cihaz kimliğiyle etiketler
+    def __init__(self, pool, instrument_id):
+        self.pool = pool
+        self.instrument_id = instrument_id
+
+    def put(self, frame):
+        frame['instrument'] = self.instrument_id
+        self.pool.publish(frame)
+
+class InstrumentPool:
+    """
+    Birden çok LibreVNA'ya bağlanır, aynı ayarları hepsine gönderir ve her
+    cihazı kendi iş parçacığında sürer. Yavaş/yanıtsız bir cihaz yalnızca kendi
+    iş parçacığını bekletir. Etiketli çerçeveler ortak bir kuyruğa düşer; kuyruk
+    doluysa en eski çerçeve atılır (cihazlar tüketiciyi beklemez).
+    """
+    def __init__(self, endpoints, log_callback=None, queue_size=256):
+        self.endpoints = [parse_endpoint(e) if isinstance(e, str) else e for e in endpoints]
+        self.log_callback = log_callback
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.workers = {}
+        self.dropped = 0
+        self.connecting = 0 # Bağlantısı/ayarı henüz bitmemiş cihaz sayısı
+        self.stopped = False
+        self.connectors = []
+        self._lock = threading.Lock()
+
+    def _client_log(self, instrument_id):
+        if not self.log_callback: return None
+        return lambda msg, type=None: self.log_callback(f"[{instrument_id}] {msg}", type)
+
+    def _start_one(self, endpoint, settings, recorder_factory):
+        ip, port = endpoint
+        instrument_id = f"{ip}:{port}"
+        client = VNAClient(log_callback=self._client_log(instrument_id))
+        if not client.connect(ip, port):
+            return False
+        configure_sweep(client, **settings)
+        if client.link_lost or client.timeouts_in_row:
+            # Bağlantıyı kabul edip ayna sorgusuna cevap vermeyen cihaz başlatılmış sayılmaz
+            client.log("İlk sorgular cevapsız kaldı; cihaz atlandı", "ERROR")
+            client.disconnect()
+            return False
+        recorder = recorder_factory(instrument_id) if recorder_factory else None
+        scheduler = SweepScheduler(settings['points'], settings.get('ifbw'))
+        worker = AcquisitionWorker(client, _PoolSink(self, instrument_id), scheduler, recorder)
+        # Diğer cihazların bağlanması beklenmeden akış başlar
+        with self._lock:
+            if self.stopped:
+                # Havuz bu cihaz bağlanırken durduruldu
+                if recorder: recorder.close()
+                client.disconnect()
+                return False
+            self.workers[instrument_id] = worker
+        worker.start()
+        return True
+
+    def _connect(self, endpoint, settings, recorder_factory):
+        try:
+            self._start_one(endpoint, settings, recorder_factory)
+        except Exception as e:
+            if self.log_callback:
+                self.log_callback(f"[{endpoint[0]}:{endpoint[1]}] Başlatma hatası: {e}", "ERROR")
+        finally:
+            with self._lock:
+                self.connecting -= 1
+
+    def start(self, settings, recorder_factory=None):
+        """
+        Her cihaza kendi iş parçacığında bağlanıp ayarlar ve hemen döner; cihaz
+        bağlantısı bitince akışa başlar. Yanıtsız cihazlar workers'a eklenmez.
+        settings, configure_sweep argümanlarıdır (start, stop, points, ifbw, ...).
+        """
+        with self._lock:
+            self.connecting += len(self.endpoints)
+        for endpoint in self.endpoints:
+            connector = threading.Thread(target=self._connect, args=(endpoint, settings, recorder_factory), daemon=True)
+            self.connectors.append(connector)
+            connector.start()
+
+    def publish(self, frame):
+        with self._lock:
+            try:
+                self.frames.put_nowait(frame)
+            except queue.Full:
+                self.frames.get_nowait()
+                self.frames.put_nowait(frame)
+                self.dropped += 1
+
+    def get(self, timeout=None):
+        """Sıradaki etiketli çerçeveyi döndürür; zaman aşımında None."""
+        try:
+            return self.frames.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def started(self):
+        """Akışı başlamış cihaz kimlikleri."""
+        with self._lock:
+            return list(self.workers)
+
+    def alive(self):
+        """Bağlanmakta olan ya da akışı süren cihaz var mı."""
+        with self._lock:
+            return self.connecting > 0 or any(w.is_alive() for w in self.workers.values())
+
+    def stats(self):
+        """{cihaz: (yeni tarama sayısı, tarama/s)}"""
+        return {i: (w.scheduler.new_sweeps, w.scheduler.sweeps_per_second()) for i, w in self.workers.items()}
+
+    def stop(self, timeout=None):
+        with self._lock:
+            self.stopped = True
+        for worker in self.workers.values():
+            worker.stop()
+        for worker in self.workers.values():
+            worker.join(timeout)
+
+# --- TOPLU DOSYA İŞLEME ---
+
+BATCH_CACHE_NAME = ".vna_batch_cache.json" # Özet tablosunun yanında tutulur
+BATCH_TASKS_PER_WORKER = 64 # Süreç bu kadar dosyadan sonra yenilenir (bellek sınırı)
+BATCH_COLUMNS = ["File", "Points", "Start(Hz)", "Stop(Hz)", "S21_min(dB)", "S21_max(dB)", "S21_mean(dB)",
+                 "RL_worst(dB)", "RL_worst_port", "RL_worst_f(Hz)", "Result"]
+
+BATCH_SIDECAR_SUFFIXES = ("_stats.csv",) # Aracın ölçüm dışı yan dosyaları (istatistik)
+BATCH_SIDECAR_MARKERS = ("_sonuc_",) # Test sonuç günlükleri
+
+def _is_tool_output(path):
+    """Özet tablosu, istatistik ve test sonucu dosyaları tarama girdisi sayılmaz."""
+    name = os.path.basename(path)
+    if name.endswith(BATCH_SIDECAR_SUFFIXES) or any(m in name for m in BATCH_SIDECAR_MARKERS):
+        return True
+    if not name.lower().endswith(".csv"): return False
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            # Başka adla yazılmış önceki özet tabloları da başlığından tanınır
+            return f.readline().startswith(",".join(BATCH_COLUMNS[:2]) + ",")
+    except OSError:
+        return False
+
+def expand_batch_inputs(patterns, exclude=()):
+    """
+    Dizin (içindeki *.csv / *.s2p) veya glob desenlerini sıralı, tekil dosya
+    listesine çevirir. exclude (ör. -o özet dosyası) ve aracın kendi yan
+    dosyaları atlanır; yeniden çalıştırmada önceki çıktılar girdi olmaz.
+    """
+    import glob
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for ext in ("*.csv", "*.s2p"):
+                files.update(glob.glob(os.path.join(pattern, ext)))
+        else:
+            files.update(f for f in glob.glob(pattern) if os.path.isfile(f))
+    skip = {os.path.abspath(f) for f in exclude}
+    return sorted(f for f in map(os.path.abspath, files) if f not in skip and not _is_tool_output(f))
+
+def file_digest(path, block=1 << 20):
+    import hashlib
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(block), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def summarize_sweep(freqs, traces, plan=None):
+    """
+    Özet metrikler: |S21| min/max/ortalama (dB), S11/S22 içinde en kötü (en
+    düşük) geri dönüş kaybı ve frekansı; plan verilirse işaretçiler ve sonuç.
+    """
+    s21 = to_db(traces['S21'])
+    rl = {p: return_loss(traces[p]) for p in ('S11', 'S22')}
+    port = min(rl, key=lambda p: rl[p].min())
+    i = int(np.argmin(rl[port]))
+    row = {'points': int(freqs.size), 'start': float(freqs[0]), 'stop': float(freqs[-1]),
+           's21_min': float(s21.min()), 's21_max': float(s21.max()), 's21_mean': float(s21.mean()),
+           'rl_worst': float(rl[port][i]), 'rl_port': port, 'rl_freq': float(freqs[i]),
+           'result': None, 'markers': []}
+    if plan:
+        result = plan.evaluate({p: (freqs, traces[p]) for p in TRACE_PARAMS})
+        row['result'] = result['pass']
+        row['markers'] = result['markers']
+    return row
+
+def _batch_job(path, plan, touchstone_dir, ts_format):
+    # Süreç havuzunda çalışır: tek dosya okunur, özetlenir, isteğe bağlı .s2p yazılır
+    try:
+        freqs, traces = read_sweep_file(path)
+        if not freqs.size:
+            raise ValueError("dosyada veri yok")
+        row = summarize_sweep(freqs, traces, plan)
+        if touchstone_dir:
+            name = os.path.splitext(os.path.basename(path))[0] + ".s2p"
+            write_touchstone(os.path.join(touchstone_dir, name), freqs, traces, fmt=ts_format)
+        return path, row, file_digest(path), None
+    except Exception as e:
+        return path, None, None, str(e)
+
+class BatchCache:
+    """
+    Dosya başına özet önbelleği (JSON). Kayıt, mtime ve boyut aynıysa doğrudan;
+    mtime değişmiş ama içerik özeti (SHA-1) aynıysa yine geçerli sayılır. Ayarlar
+    (test tanımı, Touchstone biçimi) değişince tüm kayıtlar geçersizdir.
+    """
+    def __init__(self, path, config):
+        self.path = path
+        self.config = config
+        self.entries = {}
+        self.hits = 0
+        import json
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('config') == config:
+                self.entries = data.get('files', {})
+        except (OSError, ValueError):
+            pass
+
+    def lookup(self, path, st):
+        entry = self.entries.get(path)
+        if entry is None: return None
+        if (entry['mtime_ns'], entry['size']) != (st.st_mtime_ns, st.st_size):
+            if entry['size'] != st.st_size or file_digest(path) != entry['sha1']:
+                return None
+            entry['mtime_ns'] = st.st_mtime_ns # Dokunulmuş ama değişmemiş dosya
+        self.hits += 1
+        return entry['row']
+
+    def store(self, path, st, digest, row):
+        self.entries[path] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'sha1': digest, 'row': row}
+
+    def save(self):
+        import json
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'config': self.config, 'files': self.entries}, f)
+        os.replace(tmp, self.path)
+
+def process_batch(files, plan=None, touchstone_dir=None, ts_format='RI', jobs=None, cache=None, log=None):
+    """
+    Dosyaları süreç havuzunda işler; {yol: özet} ve {yol: hata} döndürür. Her
+    süreç aynı anda tek dosyayı bellekte tutar ve BATCH_TASKS_PER_WORKER dosyada
+    bir yenilenir. jobs=1 iken havuz kurulmaz.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    rows, errors, pending = {}, {}, []
+    stats = {}
+    for path in files:
+        st = os.stat(path)
+        stats[path] = st
+        row = cache.lookup(path, st) if cache else None
+        if row is not None and touchstone_dir:
+            name = os.path.splitext(os.path.basename(path))[0] + ".s2p"
+            if not os.path.exists(os.path.join(touchstone_dir, name)): row = None
+        if row is not None:
+            rows[path] = row
+        else:
+            pending.append(path)
+
+    def collect(result):
+        path, row, digest, error = result
+        if error:
+            errors[path] = error
+            if log: log(f"{os.path.basename(path)}: {error}")
+            return
+        rows[path] = row
+        if cache: cache.store(path, stats[path], digest, row)
+
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(pending)))
+    if jobs == 1:
+        for path in pending:
+            collect(_batch_job(path, plan, touchstone_dir, ts_format))
+    elif pending:
+        try:
+            ex = ProcessPoolExecutor(max_workers=jobs, max_tasks_per_child=BATCH_TASKS_PER_WORKER)
+        except TypeError: # Python < 3.11
+            ex = ProcessPoolExecutor(max_workers=jobs)
+        with ex:
+            futures = [ex.submit(_batch_job, path, plan, touchstone_dir, ts_format) for path in pending]
+            for future in as_completed(futures):
+                collect(future.result())
+    return rows, errors
+
+def write_batch_summary(path, files, rows, errors):
+    """Tüm dosyalar için tek özet tablosu; işaretçi sütunları ilk sonuçtaki etiketlerden."""
+    labels = next((tuple(m[0] for m in rows[f]['markers']) for f in files if f in rows and rows[f]['markers']), ())
+    header = list(BATCH_COLUMNS)
+    for label in labels:
+        header += [label, f"{label} f(Hz)"]
+    header.append("Error")
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for name in files:
+            row = rows.get(name)
+            if row is None:
+                writer.writerow([name] + [""] * (len(header) - 2) + [errors.get(name, "")])
+                continue
+            result = "" if row['result'] is None else ("GEÇTİ" if row['result'] else "KALDI")
+            line = [name, row['points'], f"{row['start']:.10g}", f"{row['stop']:.10g}",
+                    f"{row['s21_min']:.4f}", f"{row['s21_max']:.4f}", f"{row['s21_mean']:.4f}",
+                    f"{row['rl_worst']:.4f}", row['rl_port'], f"{row['rl_freq']:.10g}", result]
+            values = {m[0]: m for m in row['markers']}
+            for label in labels:
+                m = values.get(label)
+                line += [f"{m[2]:.6g}", f"{m[1]:.10g}"] if m else ["", ""]
+            line.append("")
+            writer.writerow(line)
+
 # --- ARAYÜZ SINIFI ---
 
+RENDER_INTERVAL_MS = 20 # Çizim kontrolü aralığı (en fazla ~50 FPS)
+PROFILE_SWEEPS = 20 # "Profil" düğmesiyle cProfile altında izlenen tarama sayısı
+LOD_POINTS_PER_PIXEL = 2 # Çizgilere eksen piksel genişliğinin en fazla bu katı nokta verilir
+TRACE_AXES = {'S11': (0, 0), 'S12': (0, 1), 'S21': (1, 0), 'S22': (1, 1)}
+TRACE_STYLES = {'S11': ("Input", 'b-'), 'S12': ("Reverse", 'orange'), 'S21': ("Forward", 'green'), 'S22': ("Output", 'r-')}
+# Gösterim seçenekleri: ekran adı -> 'smith' ya da MEASUREMENTS türü
+TRANS_VIEWS = ('logmag', 'phase', 'gdelay', 'tdr_impulse', 'tdr_step')
+REFL_VIEWS = ('smith', 'vswr', 'rloss', 'z_re', 'z_im', 'y_mag', 'phase', 'tdr_step')
+VIEW_CHOICES = {"Smith": 'smith', **{name: kind for kind, (name, _) in MEASUREMENTS.items()}}
+
+# İstatistik izleri: tür -> (etiket, renk); 'std' ortalama ± σ olarak iki çizgiyle gösterilir
+STATS_STYLES = {'max': ("Max", 'red'), 'min': ("Min", 'blue'), 'ema': ("EMA", 'purple'),
+                'mean': ("Ort.", 'black'), 'std': ("±σ", 'gray')}
+LOG_MAX_LINES = 2000 # Log penceresinde ve bellekte tutulan en fazla satır
+LOG_FLUSH_MS = 250 # Log penceresinin güncellenme aralığı
+RELEASE_POLL_MS = 50 # Önceki oturumun iş parçacıklarının bağlantıyı bırakması için yoklama aralığı
+# tight_layout(pad=3.0) ile aynı yerleşim; her açılışta metin ölçümüyle yeniden hesaplanmaz
+PLOT_MARGINS = {'left': 0.073, 'right': 0.947, 'bottom': 0.109, 'top': 0.922, 'wspace': 0.214, 'hspace': 0.338}
+SMITH_R_CIRCLES = (0.2, 0.5, 1.0, 2.0, 5.0) # Sabit direnç çemberleri (normalize)
+SMITH_X_ARCS = (0.2, 0.5, 1.0, 2.0, 5.0) # Sabit reaktans yayları (±, normalize)
+_SMITH_GRID = None
+
+def smith_grid():
+    """
+    Smith diyagramı geometrisi: (birim çember, ızgara yayları listesi). Bir kez
+    hesaplanır; S11/S22 eksenleri ve her gösterim değişikliği aynı diziyi kullanır.
+    """
+    global _SMITH_GRID
+    if _SMITH_GRID is None:
+        theta = np.linspace(0, 2*np.pi, 200)
+        cos, sin = np.cos(theta), np.sin(theta)
+        arcs = []
+        for r in SMITH_R_CIRCLES:
+            radius = 1 / (r + 1)
+            arcs.append(np.column_stack((r / (r + 1) + radius * cos, radius * sin)))
+        for x_val in SMITH_X_ARCS:
+            for sign in (1, -1):
+                radius = 1 / x_val
+                x_circle = 1 + radius * cos
+                y_circle = sign * radius + radius * sin
+                mask = (x_circle**2 + y_circle**2) <= 1.001
+                if np.any(mask):
+                    arcs.append(np.column_stack((x_circle[mask], y_circle[mask])))
+        _SMITH_GRID = (np.column_stack((cos, sin)), arcs)
+    return _SMITH_GRID
+
+def draw_smith_background(ax):
+    """Ekseni temizleyip Smith ızgarasını çizer; yaylar tek LineCollection olarak eklenir."""
+    ax.clear()
+    unit, arcs = smith_grid()
+    ax.plot(unit[:, 0], unit[:, 1], color='black', linewidth=1.5)
+    ax.add_collection(LineCollection(arcs, colors='grey', linestyles=':', linewidths=0.6))
+    ax.axhline(0, color='black', linewidth=0.5)
+    ax.set_aspect('equal')
+    ax.set_xlim(-1.1, 1.1)
+    ax.set_ylim(-1.1, 1.1)
+    ax.grid(False)
+    ax.axis('off')
+
+def make_plot_figure():
+    """2x2 S-parametre figürü (load_plot_modules() sonrası)."""
+    fig = Figure(figsize=(10, 6), dpi=100)
+    axs = fig.subplots(2, 2)
+    fig.subplots_adjust(**PLOT_MARGINS)
+    return fig, axs
+
+class LogBuffer:
+    """
+    Sabit boyutlu, iş parçacığı güvenli log halkası. Art arda gelen aynı
+    mesajlar tek satırda sayaçla birleştirilir. Satırlar [sıra, anahtar,
+    metin, etiket, tekrar] listeleridir; pencere 'since' ile yalnızca son
+    gösterilenden sonraki değişiklikleri çeker.
+    """
+    def __init__(self, maxlen=LOG_MAX_LINES):
+        self.lines = deque(maxlen=maxlen)
+        self.lock = threading.Lock()
+        self.seq = 0
+
+    def add(self, key, text, tag):
+        with self.lock:
+            if self.lines and self.lines[-1][1] == key:
+                self.lines[-1][4] += 1
+            else:
+                self.seq += 1
+                self.lines.append([self.seq, key, text, tag, 1])
+
+    def since(self, seq):
+        """Sıra numarası >= seq olan satırların kopyaları (eskiden yeniye)."""
+        with self.lock:
+            if not self.lines or self.lines[-1][0] < seq: return []
+            pending = []
+            for line in reversed(self.lines):
+                if line[0] < seq: break
+                pending.append(tuple(line))
+        pending.reverse()
+        return pending
+
+    @staticmethod
+    def format(line):
+        text, count = line[2], line[4]
+        return text if count == 1 else f"{text}  (x{count})"
+
 class VNAApp:
     def __init__(self, root):
         self.root = root
@@ -130,14 +2185,44 @@ class VNAApp:
         # Konsol Loglama Fonksiyonu
         self.client = VNAClient(log_callback=self.add_log)
         self.is_streaming = False
+        self.worker = None
+        self.keeper = None # Akış dururken bağlantıyı sıcak tutan iş parçacığı
+        self.mailbox = FrameMailbox()
+        self.log_buffer = LogBuffer() # Tüm iş parçacıklarından gelen loglar
+        self.log_shown = (0, 0) # Pencerede son gösterilen satır: (sıra, tekrar)
         
         self.current_settings = {"start": 0, "stop": 0} 
         self.latest_data = {} # CSV kaydı ve çizim için veri deposu
+        self.plot_data = {} # Çizime hazır tam çözünürlüklü (x, y); çizgiler bunun seyreltilmiş hâlini alır
+        self.stats = SweepStats() # S12/S21 frekans başına istatistikler (toplama iş parçacığında güncellenir)
+        self.stat_lines = {} # (param, ad) -> Line2D; ad: max/min/ema/mean/std_hi/std_lo
+        self.stat_plot = {} # param -> {ad: y}; yalnızca seçili istatistik izleri
+        self.derived = DerivedMeasurements() # Faz, grup gecikmesi, VSWR, empedans, TDR (eksen önbellekli)
+        self.test_plan = None # Limit çizgileri ve işaretçiler (TestPlan)
+        self.test_plan_path = None
+        self.segment_plan = None # Segmentli tarama tanımı (SegmentPlan); None = tek tarama
+        self.test_result = None # Son değerlendirilen taramanın sonucu
+        self.marker_lines = {} # param -> işaretçi noktaları (Line2D)
+        self.recording = None # Tekrar oynatılan .vnarec dosyası
 
         self.lines = {'S11': None, 'S12': None, 'S21': None, 'S22': None}
+        self.line_axes = {}
+        self.backgrounds = None # Blit modu için eksen başına statik arka plan
+        self.frame_times = deque(maxlen=60) # Son çizim süreleri (s)
+        self.frame_stamps = deque(maxlen=60) # Son çizim zamanları (FPS için)
+        self.perf_shown = 0.0
+        self.fig = self.axs = self.canvas = None # build_plots() ile, pencere açıldıktan sonra kurulur
+        self.startup = {} # Açılış süreleri (ms): pencere, ilk grafik karesi
+        self.stream_t0 = None # Başlat'a basılma anı; ilk tarama karesi çizilince loglanır
+        PROBES.on_profile_done = lambda path: self.add_log(f"Profil kaydedildi: {path}", "FILE")
+        PROBES.on_profile_error = lambda msg: self.add_log(msg, "ERROR")
         
         self.setup_ui()
-        self.init_plots()
+        self.flush_log()
+        # Kontroller hemen görünsün; çizim kütüphanesi ve figür bir sonraki turda yüklenir
+        self.root.update()
+        self.startup['window'] = (time.perf_counter() - STARTUP_T0) * 1e3
+        self.root.after(1, self.build_plots)
 
     def setup_ui(self):
         # Ana çerçeveler
@@ -202,6 +2287,14 @@ class VNAApp:
         self.entry_power = ttk.Entry(frm_cfg, width=15)
         self.entry_power.insert(0, "0") # Varsayılan 0 dBm
         self.entry_power.grid(row=3, column=1, padx=5, pady=2)
+
+        # Segmentli tarama: yüklüyse başlangıç/bitiş/nokta/IFBW yerine segment tablosu kullanılır
+        frm_seg = ttk.Frame(control_frame)
+        frm_seg.pack(fill=tk.X, pady=(5,0))
+        ttk.Button(frm_seg, text="Segment Tablosu...", command=self.load_segment_plan).pack(side=tk.LEFT, expand=True, fill=tk.X)
+        ttk.Button(frm_seg, text="Kaldır", command=self.clear_segment_plan).pack(side=tk.LEFT)
+        self.lbl_segments = ttk.Label(control_frame, text="", font=("Consolas", 8), justify=tk.LEFT, wraplength=260)
+        self.lbl_segments.pack(anchor="w")
         
         # -------------------------------
         
@@ -210,6 +2303,40 @@ class VNAApp:
         self.btn_stream = tk.Button(control_frame, text="CANLI AKIŞI BAŞLAT", bg="#4CAF50", fg="white", font=("Arial", 11, "bold"), command=self.toggle_streaming)
         self.btn_stream.pack(fill=tk.X, pady=5, ipady=5)
 
+        self.var_blit = tk.BooleanVar(value=True)
+        ttk.Checkbutton(control_frame, text="Hızlı Çizim (Blit)", variable=self.var_blit, command=self.set_render_mode).pack(anchor="w")
+
+        self.var_record = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Akışı Kaydet (.vnarec)", variable=self.var_record).pack(anchor="w")
+
+        self.var_perf = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Performans Ölçümü", variable=self.var_perf, command=self.toggle_perf).pack(anchor="w")
+
+        # S12/S21 üzerine istatistik izleri
+        frm_stats = ttk.Frame(control_frame)
+        frm_stats.pack(fill=tk.X, pady=(5,0))
+        ttk.Label(frm_stats, text="İstatistik:").grid(row=0, column=0, sticky="w")
+        self.stat_vars = {}
+        for i, (kind, (label, _)) in enumerate(STATS_STYLES.items(), start=1):
+            self.stat_vars[kind] = tk.BooleanVar(value=False)
+            ttk.Checkbutton(frm_stats, text=label, variable=self.stat_vars[kind], command=self.toggle_stat_traces).grid(row=i // 3, column=i % 3, sticky="w")
+        ttk.Button(frm_stats, text="Sıfırla", command=self.reset_stats).grid(row=2, column=0, columnspan=3, sticky="ew")
+
+        # Grafik gösterimleri (türetilmiş ölçümler)
+        frm_view = ttk.Frame(control_frame)
+        frm_view.pack(fill=tk.X, pady=(5,0))
+        view_name = {kind: name for name, kind in VIEW_CHOICES.items()}
+        ttk.Label(frm_view, text="S11/S22:").grid(row=0, column=0, sticky="w")
+        self.combo_refl_view = ttk.Combobox(frm_view, values=[view_name[k] for k in REFL_VIEWS], width=16, state="readonly")
+        self.combo_refl_view.current(0)
+        self.combo_refl_view.grid(row=0, column=1, padx=5, pady=2)
+        self.combo_refl_view.bind("<<ComboboxSelected>>", lambda e: self.change_view(('S11', 'S22')))
+        ttk.Label(frm_view, text="S12/S21:").grid(row=1, column=0, sticky="w")
+        self.combo_trans_view = ttk.Combobox(frm_view, values=[view_name[k] for k in TRANS_VIEWS], width=16, state="readonly")
+        self.combo_trans_view.current(0)
+        self.combo_trans_view.grid(row=1, column=1, padx=5, pady=2)
+        self.combo_trans_view.bind("<<ComboboxSelected>>", lambda e: self.change_view(('S12', 'S21')))
+
         # 5. Dosya İşlemleri
         ttk.Label(control_frame, text="DOSYA İŞLEMLERİ", font=("Arial", 10, "bold")).pack(pady=(15,5))
 
@@ -218,24 +2345,38 @@ class VNAApp:
 
         self.btn_load = tk.Button(control_frame, text="CSV YÜKLE & ÇİZ", bg="#FF9800", fg="white", font=("Arial", 10, "bold"), command=self.load_csv_and_plot)
         self.btn_load.pack(fill=tk.X, pady=5, ipady=5)
+
+        self.btn_replay = tk.Button(control_frame, text="KAYIT AÇ & OYNAT", bg="#795548", fg="white", font=("Arial", 10, "bold"), command=self.open_recording)
+        self.btn_replay.pack(fill=tk.X, pady=5, ipady=5)
+
+        # Kayıt içinde tarama seçici (kayıt açılınca etkinleşir)
+        self.scale_replay = tk.Scale(control_frame, from_=0, to=0, orient=tk.HORIZONTAL, showvalue=False, state="disabled", command=self.on_replay_scrub)
+        self.scale_replay.pack(fill=tk.X)
+        self.lbl_replay = ttk.Label(control_frame, text="", foreground="gray")
+        self.lbl_replay.pack()
+
+        self.btn_limits = tk.Button(control_frame, text="LİMİT / İŞARETÇİ YÜKLE", bg="#607D8B", fg="white", font=("Arial", 10, "bold"), command=self.load_test_plan)
+        self.btn_limits.pack(fill=tk.X, pady=5, ipady=5)
+        self.lbl_test = ttk.Label(control_frame, text="", font=("Consolas", 8), justify=tk.LEFT)
+        self.lbl_test.pack(anchor="w")
         
         self.lbl_status = ttk.Label(control_frame, text="Hazır", foreground="gray")
         self.lbl_status.pack(pady=10)
 
+        # Aşama süreleri (Performans Ölçümü açıkken)
+        self.lbl_perf = ttk.Label(control_frame, text="", font=("Consolas", 8), justify=tk.LEFT)
+        self.lbl_perf.pack(anchor="w")
+        frm_perf = ttk.Frame(control_frame)
+        frm_perf.pack(fill=tk.X)
+        ttk.Button(frm_perf, text="Ölçüm Dökümü", command=self.dump_perf).pack(side=tk.LEFT, expand=True, fill=tk.X)
+        ttk.Button(frm_perf, text=f"Profil ({PROFILE_SWEEPS} tarama)", command=self.start_profile).pack(side=tk.LEFT, expand=True, fill=tk.X)
+
         # -- Sağ Panel (Grafik) --
-        plot_frame = ttk.Frame(top_frame)
-        plot_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
-        
-        self.fig = Figure(figsize=(10, 6), dpi=100)
-        self.axs = self.fig.subplots(2, 2)
-        self.fig.tight_layout(pad=3.0)
-        
-        self.canvas = FigureCanvasTkAgg(self.fig, master=plot_frame)
-        self.canvas.draw()
-        
-        toolbar = NavigationToolbar2Tk(self.canvas, plot_frame)
-        toolbar.update()
-        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.plot_frame = ttk.Frame(top_frame)
+        self.plot_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+        # Figür build_plots() ile kurulana kadar yer tutucu
+        self.lbl_plot_wait = ttk.Label(self.plot_frame, text="Grafikler yükleniyor...", font=("Arial", 11))
+        self.lbl_plot_wait.pack(expand=True)
 
         # -- Alt Panel (Debug Konsolu) --
         bottom_frame = ttk.Frame(main_pane, height=150)
@@ -260,77 +2401,158 @@ class VNAApp:
             full_msg = msg
             tag = "INFO"
 
-        self.log_text.insert(tk.END, full_msg + "\n", tag)
-        self.log_text.see(tk.END)
+        # Pencere LOG_FLUSH_MS aralıklarla flush_log ile güncellenir (Tk yalnızca ana iş parçacığından)
+        self.log_buffer.add((tag, msg), full_msg, tag)
+
+    def flush_log(self):
+        last_seq, last_count = self.log_shown
+        pending = self.log_buffer.since(last_seq)
+        shown_lines = int(self.log_text.index("end-1c").split(".")[0]) - 1
+        if pending and pending[0][0] == last_seq:
+            if pending[0][4] == last_count:
+                pending = pending[1:]
+            else:
+                # Son satırın tekrar sayacı arttı: satırı yeniden yaz
+                self.log_text.delete(f"{shown_lines}.0", "end-1c")
+                shown_lines -= 1
+        if pending:
+            for line in pending:
+                self.log_text.insert(tk.END, LogBuffer.format(line) + "\n", line[3])
+            self.log_shown = (pending[-1][0], pending[-1][4])
+            excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - LOG_MAX_LINES
+            if excess > 0:
+                self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_text.see(tk.END)
+        self.root.after(LOG_FLUSH_MS, self.flush_log)
 
     def init_plots(self):
-        # -- S11 Smith Chart --
-        ax = self.axs[0,0]
-        self.draw_smith_background(ax)
-        ax.set_title("S11 (Smith Chart)")
-        self.lines['S11'], = ax.plot([], [], 'b-', linewidth=1.5, label='S11')
-
-        # -- S12 Log Mag --
-        ax = self.axs[0,1]
-        ax.set_title("S12 (Reverse)")
-        ax.set_xlabel("MHz"); ax.set_ylabel("dB")
-        ax.grid(True, linestyle='--', alpha=0.6)
-        self.lines['S12'], = ax.plot([], [], 'orange', linewidth=1.5)
-
-        # -- S21 Log Mag --
-        ax = self.axs[1,0]
-        ax.set_title("S21 (Forward)")
-        ax.set_xlabel("MHz"); ax.set_ylabel("dB")
-        ax.grid(True, linestyle='--', alpha=0.6)
-        self.lines['S21'], = ax.plot([], [], 'green', linewidth=1.5)
-
-        # -- S22 Smith Chart --
-        ax = self.axs[1,1]
-        self.draw_smith_background(ax)
-        ax.set_title("S22 (Smith Chart)")
-        self.lines['S22'], = ax.plot([], [], 'r-', linewidth=1.5)
-
-    def draw_smith_background(self, ax):
-        ax.clear()
-        theta = np.linspace(0, 2*np.pi, 200)
-        ax.plot(np.cos(theta), np.sin(theta), color='black', linewidth=1.5)
-        
-        r_vals = [0.2, 0.5, 1.0, 2.0, 5.0]
-        for r in r_vals:
-            center_x = r / (r + 1)
-            radius = 1 / (r + 1)
-            x = center_x + radius * np.cos(theta)
-            y = radius * np.sin(theta)
-            ax.plot(x, y, color='grey', linestyle=':', linewidth=0.6)
+        for p in TRACE_PARAMS:
+            self.setup_axis(p)
+        self.set_render_mode()
 
-        x_vals = [0.2, 0.5, 1.0, 2.0, 5.0]
-        for x_val in x_vals:
-            for sign in [1, -1]:
-                radius = 1 / x_val
-                center_x = 1
-                center_y = sign * (1 / x_val)
-                x_circle = center_x + radius * np.cos(theta)
-                y_circle = center_y + radius * np.sin(theta)
-                mask = (x_circle**2 + y_circle**2) <= 1.001
-                if np.any(mask):
-                    ax.plot(x_circle[mask], y_circle[mask], color='grey', linestyle=':', linewidth=0.6)
+    def build_plots(self):
+        """matplotlib'i yükler, figürü ve izleri kurar; açılış sürelerini loglar."""
+        t0 = time.perf_counter()
+        load_plot_modules()
+        t_import = time.perf_counter() - t0
+        self.fig, self.axs = make_plot_figure()
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.plot_frame)
+        # Yeniden boyutlandırma/yakınlaştırma sonrası her tam çizimde arka plan yenilenir
+        self.canvas.mpl_connect('draw_event', self.on_canvas_draw)
+
+        toolbar = NavigationToolbar2Tk(self.canvas, self.plot_frame)
+        toolbar.update()
+        self.lbl_plot_wait.destroy()
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.init_plots() # İlk (ve tek) tam çizim burada
+        if self.latest_data:
+            self.update_plots_from_memory(rescale=True)
+        self.root.update_idletasks()
+
+        self.startup['first_frame'] = (time.perf_counter() - STARTUP_T0) * 1e3
+        self.startup['plot_import'] = t_import * 1e3
+        self.add_log(f"Açılış: pencere {self.startup['window']:.0f} ms, ilk grafik karesi {self.startup['first_frame']:.0f} ms "
+                     f"(matplotlib yükleme {self.startup['plot_import']:.0f} ms)", "INFO")
+
+    def view_kind(self, p):
+        """Parametrenin seçili gösterimi: 'smith' ya da MEASUREMENTS anahtarı."""
+        combo = self.combo_refl_view if p in ('S11', 'S22') else self.combo_trans_view
+        return VIEW_CHOICES[combo.get()]
+
+    def setup_axis(self, p):
+        """Parametrenin eksenini seçili gösterime göre (yeniden) kurar; izleri yeniden oluşturur."""
+        ax = self.axs[TRACE_AXES[p]]
+        title, style = TRACE_STYLES[p]
+        kind = self.view_kind(p)
+        if kind == 'smith':
+            # -- Smith Chart --
+            draw_smith_background(ax)
+            ax.set_title(f"{p} (Smith Chart)")
+        else:
+            ax.clear()
+            ax.set_aspect('auto'); ax.set_axis_on() # Smith ayarlarını geri al
+            label, unit = MEASUREMENTS[kind]
+            ax.set_title(f"{p} ({title})" if kind == 'logmag' else f"{p} {label}")
+            ax.set_xlabel("ns" if kind.startswith('tdr') else "MHz"); ax.set_ylabel(unit)
+            ax.grid(True, linestyle='--', alpha=0.6)
+        self.lines[p], = ax.plot([], [], style, linewidth=1.5)
+        self.line_axes[p] = ax
+        self.plot_data.pop(p, None)
+        self.marker_lines.pop(p, None)
+        if kind == 'logmag' and self.test_plan:
+            # Limit çizgileri sabit; blit arka planına dahil olur
+            for param, side, f1, f2, db1, db2 in self.test_plan.limits:
+                if param == p:
+                    ax.plot([f1 / 1e6, f2 / 1e6], [db1, db2], color='red' if side == 'UPPER' else 'magenta', linewidth=1, linestyle='--')
+            if any(param == p for param, _, _ in self.test_plan.markers):
+                self.marker_lines[p], = ax.plot([], [], 'kv', markersize=7)
 
-        ax.axhline(0, color='black', linewidth=0.5)
-        ax.set_aspect('equal')
-        ax.set_xlim(-1.1, 1.1)
-        ax.set_ylim(-1.1, 1.1)
-        ax.grid(False)
-        ax.axis('off')
+        if p in STATS_PARAMS:
+            for kind_, (label, color) in STATS_STYLES.items():
+                names = ('std_hi', 'std_lo') if kind_ == 'std' else (kind_,)
+                for name in names:
+                    self.stat_lines[(p, name)], = ax.plot([], [], color=color, linewidth=0.8, visible=False)
+        if kind != 'smith':
+            # Araç çubuğuyla yakınlaştırma/kaydırmada yalnızca görünen aralık yeniden seyreltilir
+            ax.callbacks.connect('xlim_changed', lambda ax, p=p: self.apply_lod(p))
+
+    def change_view(self, params):
+        if self.canvas is None: return # Grafikler kurulunca seçili gösterimle açılır
+        for p in params:
+            self.setup_axis(p)
+        self.toggle_stat_traces(redraw=False)
+        self.set_render_mode()
+        if self.latest_data:
+            self.update_plots_from_memory(rescale=True)
+
+    def set_render_mode(self):
+        """Blit modunda izler 'animated' olur ve tam çizimlere dahil edilmez."""
+        if self.canvas is None: return
+        blit = self.var_blit.get()
+        for line in itertools.chain(self.lines.values(), self.stat_lines.values(), self.marker_lines.values()):
+            line.set_animated(blit)
+        self.backgrounds = None
+        self.canvas.draw()
+
+    def on_canvas_draw(self, event):
+        if not self.var_blit.get():
+            self.backgrounds = None
+            return
+        # Izgaralar, Smith çemberleri ve eksenler tek seferde önbelleğe alınır
+        self.backgrounds = {ax: self.canvas.copy_from_bbox(ax.bbox) for ax in self.axs.flat}
+        for p, ax in self.line_axes.items():
+            for line in self.axis_lines(p):
+                ax.draw_artist(line)
+
+    def fit_axis_limits(self, ax, x, y):
+        """Veri mevcut sınırların dışına taşarsa eksenleri genişletir; değiştiyse True döner."""
+        # Araç çubuğuyla yakınlaştırılmış eksenlerde otomatik ölçek kapalıdır, dokunulmaz
+        changed = False
+        x_lo, x_hi = ax.get_xlim()
+        d_lo, d_hi = float(np.min(x)), float(np.max(x))
+        if ax.get_autoscalex_on() and (d_lo < x_lo or d_hi > x_hi):
+            ax.set_xlim(d_lo, d_hi if d_hi > d_lo else d_lo + 1, auto=None)
+            changed = True
+
+        finite = y[np.isfinite(y)]
+        if finite.size and ax.get_autoscaley_on():
+            y_lo, y_hi = ax.get_ylim()
+            d_lo, d_hi = float(finite.min()), float(finite.max())
+            if d_lo < y_lo or d_hi > y_hi:
+                pad = 0.1 * (d_hi - d_lo) or 1.0
+                ax.set_ylim(d_lo - pad, d_hi + pad, auto=None)
+                changed = True
+        return changed
 
     def load_csv_and_plot(self):
-        """CSV dosyasını okur, verileri işler ve grafikleri günceller."""
+        """CSV veya Touchstone (.s2p) dosyasını okur, verileri işler ve grafikleri günceller."""
         if self.is_streaming:
             messagebox.showwarning("Uyarı", "Lütfen önce canlı akışı durdurun.")
             return
 
         filename = filedialog.askopenfilename(
-            title="CSV Dosyası Seç",
-            filetypes=[("CSV Dosyaları", "*.csv"), ("Tüm Dosyalar", "*.*")]
+            title="CSV / Touchstone Dosyası Seç",
+            filetypes=[("CSV Dosyaları", "*.csv"), ("Touchstone", "*.s2p"), ("Tüm Dosyalar", "*.*")]
         )
 
         if not filename: return
@@ -338,76 +2560,298 @@ class VNAApp:
         try:
             self.add_log(f"Dosya okunuyor: {filename}", "FILE")
             
-            s11_data, s12_data, s21_data, s22_data = [], [], [], []
-
-            with open(filename, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                header = next(reader) 
-                
-                if len(header) < 9:
-                    raise ValueError("CSV formatı geçersiz. 9 sütun bekleniyor.")
-
-                for row in reader:
-                    if not row: continue
-                    try:
-                        freq = float(row[0])
-                        val11 = complex(float(row[1]), float(row[2]))
-                        val12 = complex(float(row[3]), float(row[4]))
-                        val21 = complex(float(row[5]), float(row[6]))
-                        val22 = complex(float(row[7]), float(row[8]))
-
-                        s11_data.append({'freq': freq, 'val': val11})
-                        s12_data.append({'freq': freq, 'val': val12})
-                        s21_data.append({'freq': freq, 'val': val21})
-                        s22_data.append({'freq': freq, 'val': val22})
-                    except ValueError:
-                        continue
-
-            if not s11_data:
+            freqs, traces = read_sweep_file(filename)
+            if len(freqs) == 0:
                 raise ValueError("Dosyada geçerli veri bulunamadı.")
 
-            self.latest_data = {
-                'S11': s11_data, 'S12': s12_data, 'S21': s21_data, 'S22': s22_data
-            }
+            self.latest_data = {p: (freqs, traces[p]) for p in TRACE_PARAMS}
 
-            self.add_log(f"Veri yüklendi. Nokta sayısı: {len(s11_data)}", "OK")
-            self.update_plots_from_memory()
+            self.add_log(f"Veri yüklendi. Nokta sayısı: {len(freqs)}", "OK")
+            self.update_plots_from_memory(rescale=True)
             self.lbl_status.config(text=f"Dosya Görüntüleniyor: {filename.split('/')[-1]}", foreground="blue")
 
         except Exception as e:
             self.add_log(f"Yükleme Hatası: {e}", "ERROR")
             messagebox.showerror("Hata", f"Dosya yüklenemedi:\n{e}")
 
-    def update_plots_from_memory(self):
+    def update_plots_from_memory(self, rescale=False):
         """Hafızadaki (self.latest_data) veriyi kullanarak grafikleri yeniler."""
-        
-        data_s11 = self.latest_data.get('S11', [])
-        if data_s11:
-            x = [d['val'].real for d in data_s11]
-            y = [d['val'].imag for d in data_s11]
-            self.lines['S11'].set_data(x, y)
-
-        data_s22 = self.latest_data.get('S22', [])
-        if data_s22:
-            x = [d['val'].real for d in data_s22]
-            y = [d['val'].imag for d in data_s22]
-            self.lines['S22'].set_data(x, y)
-
-        data_s12 = self.latest_data.get('S12', [])
-        if data_s12:
-            freqs = [d['freq']/1e6 for d in data_s12] # MHz çevrimi
-            mags = [20 * math.log10(abs(d['val']) + 1e-12) for d in data_s12] 
-            self.lines['S12'].set_data(freqs, mags)
-            self.axs[0,1].relim(); self.axs[0,1].autoscale_view()
-
-        data_s21 = self.latest_data.get('S21', [])
-        if data_s21:
-            freqs = [d['freq']/1e6 for d in data_s21] # MHz çevrimi
-            mags = [20 * math.log10(abs(d['val']) + 1e-12) for d in data_s21] 
-            self.lines['S21'].set_data(freqs, mags)
-            self.axs[1,0].relim(); self.axs[1,0].autoscale_view()
+        if self.canvas is None: return # build_plots() bitince çizilir
+        t0 = time.perf_counter()
+        blit = self.var_blit.get() and not rescale
+        full_draw = not blit or self.backgrounds is None
+        dirty = []
 
-        self.canvas.draw()
+        self.update_stat_plot()
+        if self.test_plan and not self.is_streaming and len(self.latest_data) == len(TRACE_PARAMS):
+            # Dosya/kayıt görüntülenirken test burada; canlı akışta toplama iş parçacığında yapılır
+            self.show_test_result(self.test_plan.evaluate(self.latest_data))
+        self.update_marker_lines()
+        for p in TRACE_PARAMS:
+            data = self.latest_data.get(p)
+            if not data: continue
+            freqs, vals = data
+            kind = self.view_kind(p)
+            if kind == 'smith':
+                self.plot_data[p] = (vals.real, vals.imag)
+                self.apply_lod(p)
+                dirty.append(p)
+            else:
+                ax = self.line_axes[p]
+                x, y = self.derived.compute(kind, freqs, vals) # x: MHz (TDR'de ns)
+                self.plot_data[p] = (x, y)
+                self.apply_lod(p)
+                dirty.append(p)
+                if blit:
+                    # Eksen yalnızca veri sınır dışına çıkınca yeniden ölçeklenir
+                    stat_ys = list(self.stat_plot.get(p, {}).values())
+                    if self.fit_axis_limits(ax, x, np.concatenate([y] + stat_ys) if stat_ys else y):
+                        full_draw = True
+                else:
+                    ax.relim(); ax.autoscale_view()
+
+        t_draw = time.perf_counter()
+        if full_draw:
+            self.canvas.draw()
+        else:
+            # Sadece değişen eksenler: arka planı geri yükle, izi çiz, blit et
+            for p in dirty:
+                ax = self.line_axes[p]
+                self.canvas.restore_region(self.backgrounds[ax])
+                for line in self.axis_lines(p):
+                    ax.draw_artist(line)
+                self.canvas.blit(ax.bbox)
+
+        now = time.perf_counter()
+        self.frame_times.append(now - t0)
+        self.frame_stamps.append(now)
+        if PROBES.enabled:
+            PROBES.record('draw', now - t_draw)
+            PROBES.record('render', now - t0)
+
+    def apply_lod(self, p):
+        """
+        plot_data[p] verisini eksen genişliğine göre seyreltip çizgiye verir.
+        Smith izlerinde |Γ|, dikdörtgen izlerde görünen x aralığındaki değer
+        kullanılır. Kaydedilen/dışa aktarılan veri (latest_data) etkilenmez.
+        """
+        data = self.plot_data.get(p)
+        if data is None: return
+        x, y = data
+        ax = self.line_axes[p]
+        buckets = ax.bbox.width * LOD_POINTS_PER_PIXEL / 2
+        if self.view_kind(p) == 'smith':
+            idx = decimate_minmax(np.hypot(x, y), buckets)
+            if idx is not None:
+                x, y = x[idx], y[idx]
+            self.lines[p].set_data(x, y)
+            return
+        window = slice(None)
+        if not ax.get_autoscalex_on() and x.size > 1:
+            # Yakınlaştırılmış eksen: görünen pencere (+ kenarlarda birer nokta)
+            lo, hi = sorted(ax.get_xlim())
+            window = slice(max(int(np.searchsorted(x, lo)) - 1, 0), min(int(np.searchsorted(x, hi)) + 1, x.size))
+        x = x[window]
+        traces = [(self.lines[p], y)] + [(self.stat_lines[(p, name)], sy) for name, sy in self.stat_plot.get(p, {}).items()]
+        for line, y in traces:
+            y = y[window]
+            idx = decimate_minmax(y, buckets)
+            if idx is None:
+                line.set_data(x, y)
+            else:
+                line.set_data(x[idx], y[idx])
+
+    def axis_lines(self, p):
+        """Eksende çizilen izler: ana iz, seçili istatistik izleri ve işaretçiler."""
+        lines = [self.lines[p]] + [self.stat_lines[(p, name)] for name in self.stat_plot.get(p, ())]
+        if p in self.marker_lines:
+            lines.append(self.marker_lines[p])
+        return lines
+
+    def update_stat_plot(self):
+        """Seçili istatistik izlerinin güncel değerlerini stat_plot'a alır."""
+        kinds = [k for k, var in self.stat_vars.items() if var.get()]
+        self.stat_plot = {}
+        if not kinds: return
+        freqs, results = self.stats.snapshot()
+        for p, res in results.items():
+            data = self.latest_data.get(p)
+            if not res or data is None or data[0].shape != freqs.shape: continue
+            if self.view_kind(p) != 'logmag': continue # İstatistikler dB büyüklük üzerindedir
+            shown = {}
+            for kind in kinds:
+                if kind == 'std':
+                    shown['std_hi'] = res['avg'] + res['std']
+                    shown['std_lo'] = res['avg'] - res['std']
+                else:
+                    shown[kind] = res[kind]
+            self.stat_plot[p] = shown
+
+    def load_test_plan(self):
+        filename = filedialog.askopenfilename(
+            title="Limit / İşaretçi Tanımı Seç",
+            filetypes=[("Metin Dosyaları", "*.txt"), ("Tüm Dosyalar", "*.*")]
+        )
+        if not filename: return
+        try:
+            plan = TestPlan.load(filename)
+        except Exception as e:
+            self.add_log(f"Test tanımı hatası: {e}", "ERROR")
+            messagebox.showerror("Hata", f"Test tanımı okunamadı:\n{e}")
+            return
+        self.test_plan, self.test_plan_path = plan, filename
+        self.test_result = None
+        self.add_log(f"Test tanımı yüklendi: {len(plan.limits)} limit, {len(plan.markers)} işaretçi ({filename})", "FILE")
+        if self.is_streaming:
+            # Sonraki taramadan itibaren yeni plan kullanılır; eski oturumu iş parçacığı kapatır
+            self.worker.set_tester(self.new_test_session())
+        self.change_view(TRACE_PARAMS)
+
+    def load_segment_plan(self):
+        filename = filedialog.askopenfilename(
+            title="Segment Tablosu Seç",
+            filetypes=[("Metin Dosyaları", "*.txt"), ("Tüm Dosyalar", "*.*")]
+        )
+        if not filename: return
+        try:
+            plan = SegmentPlan.load(filename)
+        except Exception as e:
+            self.add_log(f"Segment tanımı hatası: {e}", "ERROR")
+            messagebox.showerror("Hata", f"Segment tanımı okunamadı:\n{e}")
+            return
+        self.segment_plan = plan
+        self.add_log(f"Segment tablosu yüklendi: {plan.report()} ({filename})", "FILE")
+        self.lbl_segments.config(text=f"{len(plan.segments)} segment, {plan.start/1e6:g}-{plan.stop/1e6:g} MHz\n"
+                                      f"(sonraki başlatmada geçerli)")
+
+    def clear_segment_plan(self):
+        self.segment_plan = None
+        self.lbl_segments.config(text="")
+        self.add_log("Segment tablosu kaldırıldı; tek tarama kullanılacak.", "INFO")
+
+    def new_test_session(self):
+        if not self.test_plan: return None
+        log_path = f"{os.path.splitext(self.test_plan_path)[0]}_sonuc_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        self.add_log(f"Test sonuçları kaydediliyor: {log_path}", "FILE")
+        return TestSession(self.test_plan, log_path)
+
+    def show_test_result(self, result):
+        """Sonucu etikete yazar; geçti/kaldı durumu değişince loga düşer."""
+        previous = self.test_result
+        self.test_result = result
+        if result is None: return
+        if previous is None or previous['pass'] != result['pass']:
+            if result['pass']:
+                self.add_log("TEST GEÇTİ", "OK")
+            else:
+                self.add_log("TEST KALDI: " + "; ".join(f"{p} {k} {e:.2f} dB @ {f/1e6:.3f} MHz" for p, k, f, e in result['fails']), "WARN")
+        text = format_test_result(result)
+        if self.lbl_test.cget("text") != text:
+            self.lbl_test.config(text=text, foreground="green" if result['pass'] else "red")
+
+    def update_marker_lines(self):
+        """Son test sonucundaki dB işaretçilerini ilgili eksenlere yerleştirir."""
+        points = {p: ([], []) for p in self.marker_lines}
+        if self.test_result:
+            for label, f, value, unit in self.test_result['markers']:
+                p = label.split(' ', 1)[0]
+                if p in points and unit == "dB":
+                    points[p][0].append(f / 1e6)
+                    points[p][1].append(value)
+        for p, (x, y) in points.items():
+            self.marker_lines[p].set_data(x, y)
+
+    def toggle_stat_traces(self, redraw=True):
+        self.update_stat_plot()
+        for (p, name), line in self.stat_lines.items():
+            shown = name in self.stat_plot.get(p, ())
+            line.set_visible(shown)
+            if not shown:
+                line.set_data([], [])
+        if redraw and self.latest_data:
+            self.update_plots_from_memory()
+
+    def reset_stats(self):
+        self.stats.reset()
+        self.add_log("Tarama istatistikleri sıfırlandı.", "INFO")
+
+    def toggle_perf(self):
+        PROBES.enabled = self.var_perf.get()
+        PROBES.reset()
+        if not PROBES.enabled:
+            self.lbl_perf.config(text="")
+
+    def dump_perf(self):
+        """Aşama sürelerini loga yazar ve JSON dosyasına kaydeder."""
+        if not PROBES.samples:
+            messagebox.showwarning("Uyarı", "Henüz ölçüm yok. 'Performans Ölçümü'nü açıp akışı başlatın.")
+            return
+        for line in PROBES.format_summary().splitlines():
+            self.add_log(line, "INFO")
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            initialfile=f"vna_perf_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            filetypes=[("JSON", "*.json"), ("Tüm Dosyalar", "*.*")],
+            title="Ölçüm Dökümünü Kaydet"
+        )
+        if not filename: return
+        PROBES.dump(filename)
+        self.add_log(f"Ölçüm dökümü kaydedildi: {filename}", "FILE")
+
+    def start_profile(self):
+        if not self.is_streaming:
+            messagebox.showwarning("Uyarı", "Profil almak için canlı akışı başlatın.")
+            return
+        prefix = f"vna_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        PROBES.request_profile(PROFILE_SWEEPS, prefix)
+        names = "_all.prof" if sys.version_info >= (3, 12) else "_acq/_render.prof"
+        self.add_log(f"Profil başladı: {PROFILE_SWEEPS} tarama ({prefix}{names})", "INFO")
+
+    def render_stats(self):
+        """(FPS, ortalama çizim süresi ms) döndürür."""
+        if len(self.frame_stamps) < 2: return 0.0, 0.0
+        span = self.frame_stamps[-1] - self.frame_stamps[0]
+        fps = (len(self.frame_stamps) - 1) / span if span > 0 else 0.0
+        return fps, 1e3 * sum(self.frame_times) / len(self.frame_times)
+
+    def open_recording(self):
+        """.vnarec kaydını belleğe eşleyerek açar ve tarama seçiciyi etkinleştirir."""
+        if self.is_streaming:
+            messagebox.showwarning("Uyarı", "Lütfen önce canlı akışı durdurun.")
+            return
+
+        filename = filedialog.askopenfilename(
+            title="Kayıt Dosyası Seç",
+            filetypes=[("VNA Kayıtları", "*.vnarec"), ("Tüm Dosyalar", "*.*")]
+        )
+        if not filename: return
+
+        try:
+            recording = SweepRecording(filename)
+            if len(recording) == 0:
+                raise ValueError("Kayıtta tarama yok.")
+        except Exception as e:
+            self.add_log(f"Kayıt Açma Hatası: {e}", "ERROR")
+            messagebox.showerror("Hata", f"Kayıt açılamadı:\n{e}")
+            return
+
+        self.recording = recording
+        self.add_log(f"Kayıt açıldı: {filename} ({len(recording)} tarama, {len(recording.freqs)} nokta)", "FILE")
+        self.scale_replay.config(from_=0, to=len(recording) - 1, state="normal")
+        self.scale_replay.set(0)
+        self.show_recorded_sweep(0, rescale=True)
+
+    def on_replay_scrub(self, value):
+        if self.recording and not self.is_streaming:
+            self.show_recorded_sweep(int(float(value)))
+
+    def show_recorded_sweep(self, index, rescale=False):
+        frame = self.recording[index]
+        for p in TRACE_PARAMS:
+            self.latest_data[p] = frame[p]
+        self.update_plots_from_memory(rescale=rescale)
+        stamp = datetime.fromtimestamp(frame['timestamp']).strftime("%H:%M:%S")
+        self.lbl_replay.config(text=f"Tarama {index + 1}/{len(self.recording)} - {stamp}")
 
     def save_csv(self):
         if not self.latest_data or 'S11' not in self.latest_data:
@@ -420,34 +2864,23 @@ class VNAApp:
         filename = filedialog.asksaveasfilename(
             defaultextension=".csv", 
             initialfile=initial_file,
-            filetypes=[("CSV Dosyaları", "*.csv"), ("Tüm Dosyalar", "*.*")],
+            filetypes=[("CSV Dosyaları", "*.csv"), ("Touchstone", "*.s2p"), ("Tüm Dosyalar", "*.*")],
             title="Ölçüm Sonuçlarını Kaydet"
         )
         
         if not filename: return 
         
         try:
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                header = ["Freq(Hz)", "S11_Real", "S11_Imag", "S12_Real", "S12_Imag", "S21_Real", "S21_Imag", "S22_Real", "S22_Imag"]
-                writer.writerow(header)
-                
-                s11 = self.latest_data.get('S11', [])
-                s12 = self.latest_data.get('S12', [])
-                s21 = self.latest_data.get('S21', [])
-                s22 = self.latest_data.get('S22', [])
-                
-                for i in range(len(s11)):
-                    freq = s11[i]['freq']
-                    val11 = s11[i]['val'] if i < len(s11) else 0j
-                    val12 = s12[i]['val'] if i < len(s12) else 0j
-                    val21 = s21[i]['val'] if i < len(s21) else 0j
-                    val22 = s22[i]['val'] if i < len(s22) else 0j
-                    
-                    row = [freq, val11.real, val11.imag, val12.real, val12.imag, val21.real, val21.imag, val22.real, val22.imag]
-                    writer.writerow(row)
-                    
+            freqs, traces = sweep_from_data(self.latest_data)
+            write_sweep_file(filename, freqs, traces)
             self.add_log(f"Veriler kaydedildi: {filename}", "FILE")
+
+            # Akış boyunca toplanan istatistikler yan dosyaya yazılır
+            stat_freqs, results = self.stats.snapshot()
+            if stat_freqs is not None and self.stats.count:
+                stats_file = os.path.splitext(filename)[0] + "_stats.csv"
+                write_stats_csv(stats_file, stat_freqs, results)
+                self.add_log(f"İstatistikler kaydedildi: {stats_file} ({self.stats.count} tarama)", "FILE")
             messagebox.showinfo("Başarılı", f"Dosya başarıyla kaydedildi:\n{filename}")
             
         except Exception as e:
@@ -479,90 +2912,1041 @@ class VNAApp:
                 
                 # ------------------------------
                 
+                segments = self.segment_plan
+                if segments:
+                    # Segment tablosu aralığı ve noktaları belirler; Ortalama/Tip/Güç paneldekiler
+                    segments.avg, segments.sweep_type, segments.power = avg_val, sweep_type, power_val
+                    start, stop = segments.start, segments.stop
                 if not (start and stop): raise ValueError("Frekans hatası")
                 
+                recorder = None
+                if self.var_record.get():
+                    rec_file = filedialog.asksaveasfilename(
+                        defaultextension=".vnarec",
+                        initialfile=f"vna_kayit_{datetime.now().strftime('%Y%m%d_%H%M%S')}.vnarec",
+                        filetypes=[("VNA Kayıtları", "*.vnarec"), ("Tüm Dosyalar", "*.*")],
+                        title="Akış Kaydı Dosyası"
+                    )
+                    if not rec_file: return
+                    recorder = SweepRecorder(rec_file)
+
                 self.current_settings = {"start": start, "stop": stop}
+                self.stream_t0 = time.perf_counter()
                 self.add_log(f"Bağlanılıyor... Hedef: {start}-{stop} Hz", "INFO")
+
+                # Önceki oturumun iş parçacıkları bağlantıyı bırakana dek Tk döngüsü bloklanmadan beklenir
+                if self.keeper:
+                    self.keeper.stop()
+                self.btn_stream.config(state="disabled")
                 self.root.update()
-                
-                if not self.client.connect(ip, port):
-                    self.add_log("Bağlantı Başarısız!", "ERROR")
-                    return
-                
-                # VNA Modu
-                self.client.send_cmd(":DEV:MODE VNA")
-                
-                # 1. Temel Tarama Ayarları
-                self.client.send_cmd(f":VNA:FREQ:START {start}")
-                self.client.send_cmd(f":VNA:FREQ:STOP {stop}")
-                self.client.send_cmd(f":VNA:ACQ:POINTS {points}")
-                
-                # 2. Hassasiyet ve Ortalama
-                if ifbw_val:
-                    self.client.send_cmd(f":VNA:ACQ:IFBW {ifbw_val}")
-                
-                if avg_val >= 1:
-                    self.client.send_cmd(f":VNA:ACQ:AVG {avg_val}")
-                
-                # 3. YENİ ÖZELLİKLERİN GÖNDERİLMESİ (PDF 4.3.10 ve 4.3.20)
-                self.add_log(f"Tip: {sweep_type}, Güç: {power_val} dBm", "CMD")
-                self.client.send_cmd(f":VNA:SWEEPTYPE {sweep_type}")
-                self.client.send_cmd(f":VNA:STIM:LVL {power_val}")
-                
-                # 4. Taramayı Başlat
-                self.client.send_cmd(":VNA:ACQ:SINGLE FALSE") 
-                self.client.send_cmd(":VNA:ACQ:RUN")  
-                
-                # Trace Kontrolü
-                existing_traces = self.client.query(":VNA:TRAC:LIST?") or ""
-                for p in ['S11', 'S12', 'S21', 'S22']:
-                    if p not in existing_traces:
-                        self.client.send_cmd(f":VNA:TRAC:NEW {p}")
-                    self.client.send_cmd(f":VNA:TRAC:PARAM {p} {p}")
-
-                self.is_streaming = True
-                self.btn_stream.config(text="DURDUR", bg="#d32f2f")
-                self.btn_load.config(state="disabled") 
-                self.lbl_status.config(text="Canlı Akış Aktif", foreground="green")
-                
-                self.stream_loop()
-                
+                self.when_released(lambda: self.start_streaming(ip, port, start, stop, points, ifbw_val, avg_val,
+                                                                sweep_type, power_val, segments, recorder))
+
             except Exception as e:
                 self.add_log(f"Başlatma Hatası: {e}", "ERROR")
                 messagebox.showerror("Hata", str(e))
         else:
-            # DURDUR
-            if self.client.sock:
-                self.client.send_cmd(":VNA:ACQ:STOP")
-                
+            # DURDUR (ACQ:STOP iş parçacığı içinde yapılır; bağlantı açık kalır ve yoklanır)
+            if self.worker:
+                self.worker.stop()
+                self.keeper = SessionKeeper(self.client, after=self.worker)
+                self.keeper.start()
+
             self.is_streaming = False
             self.btn_stream.config(text="CANLI AKIŞI BAŞLAT", bg="#4CAF50")
             self.btn_load.config(state="normal") 
+            self.btn_replay.config(state="normal")
+            if self.recording:
+                self.scale_replay.config(state="normal")
             self.lbl_status.config(text="Durduruldu.", foreground="black")
-            self.client.disconnect()
+
+    def when_released(self, then):
+        """Akış ve yoklama iş parçacıkları bittiğinde then'i çağırır; beklerken root.after ile yoklar."""
+        if any(t and t.is_alive() for t in (self.keeper, self.worker)):
+            self.root.after(RELEASE_POLL_MS, self.when_released, then)
+            return
+        self.keeper = None
+        self.btn_stream.config(state="normal")
+        then()
+
+    @staticmethod
+    def open_session(client, ip, port, sweep):
+        """Akış iş parçacığında çalışır: gerekirse bağlanır ve taramayı ayarlar (sweep None: segmentli)."""
+        if client.sock and not client.link_lost:
+            client.log(f"Açık bağlantı kullanılıyor: {ip}:{port}", "INFO")
+        elif not client.connect(ip, port):
+            raise ConnectionError(f"Bağlantı başarısız: {ip}:{port}")
+        if sweep is None:
+            # Her segment akış sırasında ayarlanır; yeniden bağlanmada da segmentler uygulanır
+            client.sweep_config = None
+            return
+        configure_sweep(client, **sweep)
+        client.log(f"Ayar aynası: {client.state.report()}", "INFO")
+
+    def start_streaming(self, ip, port, start, stop, points, ifbw_val, avg_val, sweep_type, power_val, segments, recorder):
+        try:
+            # Aynı cihaza açık ve sağlıklı bağlantı varsa yeniden kullanılır; bağlanma iş parçacığında yapılır
+            client = self.client
+            if not (client.sock and not client.link_lost and (client.ip, int(client.port)) == (ip, port)):
+                client.disconnect()
+                self.client = VNAClient(log_callback=self.add_log)
+
+            self.add_log(f"Tip: {sweep_type}, Güç: {power_val} dBm", "CMD")
+            sweep = None
+            if segments:
+                self.add_log(f"Segmentli tarama: {segments.report()}", "INFO")
+            else:
+                sweep = dict(start=start, stop=stop, points=points, ifbw=ifbw_val, avg=avg_val,
+                             sweep_type=sweep_type, power=power_val)
+            setup = lambda client: self.open_session(client, ip, port, sweep)
+
+            self.is_streaming = True
+            self.btn_stream.config(text="DURDUR", bg="#d32f2f")
+            self.btn_load.config(state="disabled") 
+            self.btn_replay.config(state="disabled")
+            self.scale_replay.config(state="disabled")
+            self.lbl_status.config(text="Canlı Akış Aktif", foreground="green")
+
+            scheduler = segments.make_scheduler() if segments else SweepScheduler(points, ifbw_val)
+            self.add_log(f"Tahmini tarama süresi: {scheduler.estimate*1e3:.0f} ms", "INFO")
+
+            self.mailbox = FrameMailbox()
+            self.stats.reset()
+            self.test_result = None
+            self.worker = AcquisitionWorker(self.client, self.mailbox, scheduler, recorder, self.stats, self.new_test_session(),
+                                            keep_connection=True, segments=segments, setup=setup)
+            if recorder:
+                self.add_log(f"Akış kaydediliyor: {recorder.path}", "FILE")
+            self.worker.start()
+            self.stream_loop()
+            
+        except Exception as e:
+            self.add_log(f"Başlatma Hatası: {e}", "ERROR")
+            messagebox.showerror("Hata", str(e))
 
     def stream_loop(self):
         if not self.is_streaming: return
+        t0 = time.perf_counter()
+
+        # Yalnızca en son çerçeve alınır; arada kalan eski taramalar atlanır
+        frame = self.mailbox.take()
+        if frame:
+            for p in TRACE_PARAMS:
+                self.latest_data[p] = frame[p]
+            if 'test' in frame:
+                self.show_test_result(frame['test'])
+            self.update_plots_from_memory()
+            if self.stream_t0 is not None:
+                self.add_log(f"İlk tarama karesi: {(time.perf_counter() - self.stream_t0) * 1e3:.0f} ms (Başlat → ekran)", "INFO")
+                self.stream_t0 = None
+            fps, draw_ms = self.render_stats()
+            sched = self.worker.scheduler
+            self.lbl_status.config(text=f"Canlı Akış Aktif | {fps:.1f} FPS, çizim {draw_ms:.1f} ms\n"
+                                        f"{sched.sweeps_per_second():.2f} tarama/s, boşa çekim: {sched.wasted}", foreground="green")
+            PROBES.profile_tick('render')
+            if PROBES.enabled and time.perf_counter() - self.perf_shown > 0.5:
+                self.perf_shown = time.perf_counter()
+                self.lbl_perf.config(text=PROBES.format_summary())
 
-        # 1. Verileri Çek
-        data_s11 = self.client.get_trace_data("S11")
-        data_s12 = self.client.get_trace_data("S12")
-        data_s21 = self.client.get_trace_data("S21")
-        data_s22 = self.client.get_trace_data("S22")
+        if self.worker.error is not None:
+            # Toplama iş parçacığı hatayla bitti: akışı arayüzde de durdur
+            error = self.worker.error
+            self.toggle_streaming()
+            self.lbl_status.config(text=f"Akış hatayla durdu:\n{error}", foreground="red")
+            return
 
-        # 2. Verileri Hafızaya Al
-        if data_s11: self.latest_data['S11'] = data_s11
-        if data_s12: self.latest_data['S12'] = data_s12
-        if data_s21: self.latest_data['S21'] = data_s21
-        if data_s22: self.latest_data['S22'] = data_s22
+        # Çizim hızı veri toplama hızından bağımsız
+        elapsed_ms = int((time.perf_counter() - t0) * 1e3)
+        self.root.after(max(1, RENDER_INTERVAL_MS - elapsed_ms), self.stream_loop)
 
-        # 3. Grafikleri Güncelle
-        self.update_plots_from_memory()
-        
-        # 50ms sonra tekrar
-        self.root.after(50, self.stream_loop)
+# --- SAHTE LIBREVNA SUNUCUSU (TEST / ÖLÇÜM) ---
 
-if __name__ == "__main__":
+class MockVNAServer:
+    """
+    Donanım olmadan ölçüm yapabilmek için LibreVNA SCPI alt kümesini konuşan
+    yerel sunucu. Cevap gecikmesi, bant genişliği ve tarama süresi ayarlanabilir;
+    tarama verisi seri rezonatör modelinden (S21 = 1 - S11) üretilir ve her
+    yeni taramada hafif gürültüyle değişir.
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, bandwidth=None, sweep_time=None, f0=None):
+        self.latency = latency # Cevap başına gecikme (s)
+        self.bandwidth = bandwidth # Bayt/s; None = sınırsız
+        self.sweep_time = sweep_time # None = nokta sayısı/IFBW'den tahmin
+        self.f0 = f0 # Rezonans frekansı; None = taranan aralığın geometrik ortası
+        self.state = {'mode': 'VNA', 'start': 100e3, 'stop': 6e9, 'points': 201, 'ifbw': 1e3,
+                      'avg': 1, 'sweeptype': 'LIN', 'power': 0.0, 'single': False, 'running': True}
+        self.traces = {}
+        self.commands = 0 # Alınan toplam komut satırı
+        self.stall_until = 0.0 # Bu ana kadar cevaplar bekletilir (sessiz bağlantı testi)
+        self.run_started = time.monotonic()
+        self._cache = {}
+        self._lock = threading.Lock()
+        self._conns = set()
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(8)
+        self.address = self.listener.getsockname()
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self.address
+
+    def stop(self):
+        self.listener.close()
+        self.drop_connections()
+
+    def drop_connections(self):
+        """Tüm istemci bağlantılarını keser (bağlantı kopması testi için)."""
+        with self._lock:
+            conns, self._conns = list(self._conns), set()
+        for conn in conns:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+                conn.close()
+            except OSError:
+                pass
+
+    def stall(self, seconds):
+        """Cevapları verilen süre boyunca geciktirir; istemci zaman aşımına düşer, geç cevaplar sonra gelir."""
+        self.stall_until = time.monotonic() + seconds
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            with self._lock:
+                self._conns.add(conn)
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn):
+        try:
+            with conn, conn.makefile('rb') as rfile:
+                for line in rfile:
+                    line = line.decode('ascii', errors='replace').strip()
+                    if not line: continue
+                    self.commands += 1
+                    response = self.execute(line)
+                    if response is not None:
+                        self._send(conn, response)
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._conns.discard(conn)
+
+    def _send(self, conn, data):
+        stall = self.stall_until - time.monotonic()
+        if stall > 0:
+            time.sleep(stall)
+        if self.latency:
+            time.sleep(self.latency)
+        if not self.bandwidth:
+            conn.sendall(data)
+            return
+        chunk = 65536
+        for i in range(0, len(data), chunk):
+            part = data[i:i + chunk]
+            conn.sendall(part)
+            time.sleep(len(part) / self.bandwidth)
+
+    def current_sweep_time(self):
+        if self.sweep_time is not None: return self.sweep_time
+        return estimate_sweep_time(self.state['points'], self.state['ifbw'])
+
+    def sweep_index(self):
+        if not self.state['running']: return 0
+        return int((time.monotonic() - self.run_started) / self.current_sweep_time())
+
+    def frequencies(self):
+        st = self.state
+        if st['sweeptype'] == 'LOG':
+            return np.geomspace(st['start'], st['stop'], st['points'])
+        return np.linspace(st['start'], st['stop'], st['points'])
+
+    def sweep_payload(self, param):
+        """Geçerli tarama için ':VNA:TRAC:DATA?' cevabı (tarama başına önbellekli)."""
+        # Ardışık taramalar farklı olsun yeter: gürültü deseni 8 varyant arasında döner
+        key = (param, self.sweep_index() % 8, tuple(sorted(self.state.items())))
+        payload = self._cache.get(key)
+        if payload is None:
+            freqs = self.frequencies()
+            f0 = self.f0 or np.sqrt(self.state['start'] * self.state['stop'])
+            rng = np.random.default_rng(key[1])
+            s21 = 1 / (1 + 1j * 20 * (freqs / f0 - f0 / freqs))
+            s21 = s21 * np.exp(-2j * np.pi * freqs * 1e-9) + 1e-3 * (rng.standard_normal(len(freqs)) + 1j * rng.standard_normal(len(freqs)))
+            vals = s21 if param in ('S21', 'S12') else 1 - s21
+            payload = (",".join(f"[{f:.0f},{v.real:.9g},{v.imag:.9g}]" for f, v in zip(freqs, vals)) + "\n").encode('ascii')
+            if len(self._cache) > 64:
+                self._cache.clear()
+            self._cache[key] = payload
+        return payload
+
+    def execute(self, line):
+        """Tek SCPI satırını işler; sorgular için cevap baytlarını döndürür."""
+        header, _, arg = line.partition(' ')
+        header = header.upper().replace(':TRACE:', ':TRAC:').replace(':ACQUISITION:', ':ACQ:').replace(':FREQUENCY:', ':FREQ:')
+        arg = arg.strip()
+        st = self.state
+        setters = {
+            ':VNA:FREQ:START': ('start', float), ':VNA:FREQ:STOP': ('stop', float),
+            ':VNA:ACQ:POINTS': ('points', int), ':VNA:ACQ:IFBW': ('ifbw', float), ':VNA:ACQ:AVG': ('avg', int),
+            ':VNA:SWEEPTYPE': ('sweeptype', str.upper), ':VNA:STIM:LVL': ('power', float), ':DEV:MODE': ('mode', str.upper),
+        }
+
+        if header == '*IDN?':
+            return b"LibreVNA,MockVNA,0,0.1\n"
+        if header in setters:
+            key, conv = setters[header]
+            try:
+                st[key] = conv(arg)
+            except ValueError:
+                pass
+            # Gerçek cihazda olduğu gibi ayar değişikliği taramayı yeniden başlatır
+            self.run_started = time.monotonic()
+            return None
+        if header.endswith('?') and header[:-1] in setters:
+            value = st[setters[header[:-1]][0]]
+            return (f"{value:g}\n" if isinstance(value, (int, float)) else f"{value}\n").encode()
+        if header == ':VNA:ACQ:SINGLE':
+            st['single'] = arg.upper() in ('TRUE', '1', 'ON')
+            return None
+        if header in (':VNA:ACQ:SINGLE?', ':VNA:ACQ:RUN?'):
+            return b"TRUE\n" if st['single' if 'SINGLE' in header else 'running'] else b"FALSE\n"
+        if header == ':VNA:ACQ:RUN':
+            st['running'] = True
+            self.run_started = time.monotonic()
+            return None
+        if header == ':VNA:ACQ:STOP':
+            st['running'] = False
+            return None
+        if header == ':VNA:ACQ:FIN?':
+            return b"TRUE\n" if self.sweep_index() > 0 else b"FALSE\n"
+        if header == ':VNA:ACQ:AVGLEV?':
+            return f"{min(self.sweep_index(), st['avg'])}\n".encode()
+        if header == ':VNA:TRAC:LIST?':
+            return (",".join(self.traces) + "\n").encode()
+        if header == ':VNA:TRAC:NEW':
+            self.traces.setdefault(arg, arg)
+            return None
+        if header == ':VNA:TRAC:PARAM':
+            name, _, param = arg.partition(' ')
+            self.traces[name] = param.strip() or name
+            return None
+        if header == ':VNA:TRAC:PARAM?':
+            return f"{self.traces.get(arg, 'ERROR')}\n".encode()
+        if header == ':VNA:TRAC:DATA?':
+            param = self.traces.get(arg, arg)
+            return self.sweep_payload(param)
+        if header.endswith('?'):
+            return b"ERROR\n"
+        return None
+
+# --- PERFORMANS ÖLÇÜMLERİ ---
+
+def _make_trace_payload(points):
+    """Cihazın ':VNA:TRAC:DATA?' cevabına benzeyen sentetik veri üretir."""
+    freqs = np.linspace(100e3, 6e9, points)
+    vals = 0.5 * np.exp(-1j * freqs / 1e9)
+    return ",".join(f"[{f:.0f},{v.real:.9g},{v.imag:.9g}]" for f, v in zip(freqs, vals)).encode('ascii') + b"\n"
+
+def _parse_trace_legacy(raw):
+    # Eski sözlük listesi yöntemi (yalnızca karşılaştırma için)
+    clean_str = raw.replace('[', '').replace(']', '')
+    values = clean_str.split(',')
+    parsed = []
+    for i in range(0, len(values), 3):
+        if i+2 < len(values):
+            parsed.append({'freq': float(values[i]), 'val': complex(float(values[i+1]), float(values[i+2]))})
+    return parsed
+
+def bench_parse(sizes=(201, 1601, 10001), repeat=50):
+    """Vektörel ayrıştırıcıyı eski sözlük listesi yöntemiyle karşılaştırır."""
+    print(f"{'Nokta':>8} {'Eski (ms)':>12} {'NumPy (ms)':>12} {'Hızlanma':>10}")
+    for points in sizes:
+        raw = _make_trace_payload(points)
+        text = raw.decode('ascii').strip()
+
+        t0 = time.perf_counter()
+        for _ in range(repeat): _parse_trace_legacy(text)
+        t_legacy = (time.perf_counter() - t0) / repeat
+
+        t0 = time.perf_counter()
+        for _ in range(repeat): parse_trace_data(raw)
+        t_numpy = (time.perf_counter() - t0) / repeat
+
+        print(f"{points:>8} {t_legacy*1e3:>12.3f} {t_numpy*1e3:>12.3f} {t_legacy/t_numpy:>9.1f}x")
+
+def bench_stats(points=10001, sweeps=500):
+    """SweepStats güncelleme maliyeti; hedef 10k nokta x 100 tarama/s."""
+    freqs = np.linspace(100e3, 6e9, points)
+    rng = np.random.default_rng(0)
+    frames = [{p: (freqs, (rng.standard_normal(points) + 1j * rng.standard_normal(points)) * 0.1)
+               for p in TRACE_PARAMS} for _ in range(8)]
+    stats = SweepStats()
+    t0 = time.perf_counter()
+    for i in range(sweeps):
+        stats.update(frames[i % len(frames)])
+    per_sweep = (time.perf_counter() - t0) / sweeps
+    print(f"{points} nokta, {len(STATS_PARAMS)} iz: {per_sweep*1e3:.3f} ms/tarama, "
+          f"en fazla {1/per_sweep:.0f} tarama/s")
+    return per_sweep
+
+def bench_derived(sizes=(1601, 10001), repeat=50):
+    """Türetilmiş ölçümlerin (eksen önbelleği dolu) tarama başına maliyeti."""
+    print(f"{'Nokta':>8} " + " ".join(f"{kind:>11}" for kind in MEASUREMENTS) + "  (ms)")
+    for points in sizes:
+        freqs = np.linspace(100e3, 6e9, points)
+        vals = 0.5 * np.exp(-2j * np.pi * freqs * 1e-9)
+        engine = DerivedMeasurements()
+        row = []
+        for kind in MEASUREMENTS:
+            engine.compute(kind, freqs, vals)
+            t0 = time.perf_counter()
+            for _ in range(repeat): engine.compute(kind, freqs, vals)
+            row.append((time.perf_counter() - t0) / repeat * 1e3)
+        print(f"{points:>8} " + " ".join(f"{t:>11.3f}" for t in row))
+
+def _query_legacy(sock, cmd):
+    # Eski recv(4096) + string birleştirme yöntemi (yalnızca karşılaştırma için)
+    sock.sendall((cmd + "\n").encode('ascii'))
+    response = ""
+    while True:
+        response += sock.recv(4096).decode('ascii')
+        if response.endswith("\n"):
+            break
+    return response.strip()
+
+def _start_payload_server(payload):
+    """Her satıra aynı cevabı dönen basit yerel sunucu; (host, port) döndürür."""
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(1)
+
+    def serve():
+        conn, _ = srv.accept()
+        try:
+            with conn, conn.makefile('rb') as rfile:
+                for _ in rfile:
+                    conn.sendall(payload)
+        except OSError:
+            pass # İstemci bağlantıyı kapattı
+        srv.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return srv.getsockname()
+
+def bench_recv(points=(100001, 400001), repeat=10):
+    """Eski ve tamponlu alım yolunun hız ve bellek tahsisi karşılaştırması."""
+    import tracemalloc
+    print(f"{'Nokta':>8} {'Boyut(MB)':>10} {'Yöntem':>8} {'MB/s':>9} {'Tepe tahsis(MB)':>16}")
+    for n in points:
+        payload = _make_trace_payload(n)
+        size_mb = len(payload) / 1e6
+
+        for name in ("eski", "tampon"):
+            host, port = _start_payload_server(payload)
+            client = VNAClient(log_callback=lambda msg, type=None: None)
+            client.connect(host, port)
+            if name == "eski":
+                run = lambda: _query_legacy(client.sock, ":VNA:TRAC:DATA? S11")
+            else:
+                run = lambda: client.query_raw(":VNA:TRAC:DATA? S11")
+            run() # Isınma (tampon büyümesi dahil)
+
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                run()
+            elapsed = time.perf_counter() - t0
+
+            # Tek sorgunun yaptığı en yüksek ek bellek tahsisi
+            tracemalloc.start()
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            print(f"{n:>8} {size_mb:>10.2f} {name:>8} {size_mb*repeat/elapsed:>9.1f} {peak/1e6:>16.2f}")
+            client.disconnect()
+
+def _write_csv_legacy(path, freqs, traces):
+    # Eski satır satır csv.writer yöntemi (yalnızca karşılaştırma için)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        for i in range(len(freqs)):
+            row = [freqs[i]]
+            for p in TRACE_PARAMS:
+                v = complex(traces[p][i])
+                row += [v.real, v.imag]
+            writer.writerow(row)
+
+def _read_csv_legacy(path):
+    # Eski satır başına complex(float(...)) + sözlük yöntemi
+    data = {p: [] for p in TRACE_PARAMS}
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            if not row: continue
+            freq = float(row[0])
+            for i, p in enumerate(TRACE_PARAMS):
+                data[p].append({'freq': freq, 'val': complex(float(row[1 + 2*i]), float(row[2 + 2*i]))})
+    return data
+
+def bench_io(sizes=(10000, 1000000)):
+    """CSV/Touchstone okuma-yazma sürelerini eski CSV yöntemiyle karşılaştırır."""
+    import tempfile
+    print(f"{'Satır':>8} {'İşlem':>18} {'Süre (s)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            freqs = np.linspace(100e3, 6e9, rows)
+            traces = {p: 0.5 * np.exp(-1j * freqs / (k + 1) / 1e9) for k, p in enumerate(TRACE_PARAMS)}
+            csv_path = os.path.join(tmp, "sweep.csv")
+            s2p_path = os.path.join(tmp, "sweep.s2p")
+
+            cases = [
+                ("eski CSV yazma", lambda: _write_csv_legacy(csv_path, freqs, traces)),
+                ("eski CSV okuma", lambda: _read_csv_legacy(csv_path)),
+                ("CSV yazma", lambda: write_csv_sweep(csv_path, freqs, traces)),
+                ("CSV okuma", lambda: read_csv_sweep(csv_path)),
+                ("Touchstone yazma", lambda: write_touchstone(s2p_path, freqs, traces)),
+                ("Touchstone okuma", lambda: read_touchstone(s2p_path)),
+            ]
+            for name, run in cases:
+                t0 = time.perf_counter()
+                run()
+                print(f"{rows:>8} {name:>18} {time.perf_counter() - t0:>10.3f}")
+
+def _timing_summary(samples):
+    ms = np.asarray(samples) * 1e3
+    return {'n': int(ms.size), 'mean_ms': float(ms.mean()), 'p50_ms': float(np.percentile(ms, 50)),
+            'p95_ms': float(np.percentile(ms, 95)), 'max_ms': float(ms.max())}
+
+def _time_calls(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    return _timing_summary(samples)
+
+def _bench_render(points, frames=50, lod=False):
+    """
+    Ekransız (Agg) 2x2 çizim: tam çizim ve blit yolunun süreleri. lod=True iken
+    her karede min/max seyreltme de yapılır. matplotlib yoksa None.
+    """
+    try:
+        from matplotlib.figure import Figure as AggFigure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+    except ImportError:
+        return None
+    fig = AggFigure(figsize=(10, 6), dpi=100)
+    axs = fig.subplots(2, 2)
+    canvas = FigureCanvasAgg(fig)
+    freqs = np.linspace(100e3, 6e9, points) / 1e6
+    lines = []
+    for ax in axs.flat:
+        line, = ax.plot(freqs, np.zeros(points))
+        ax.set_ylim(-2, 2)
+        lines.append(line)
+
+    def update():
+        y = np.random.standard_normal(points) * 0.1
+        for ax, line in zip(axs.flat, lines):
+            idx = decimate_minmax(y, ax.bbox.width * LOD_POINTS_PER_PIXEL / 2) if lod else None
+            if idx is None:
+                line.set_data(freqs, y)
+            else:
+                line.set_data(freqs[idx], y[idx])
+
+    def full():
+        update()
+        canvas.draw()
+
+    full_stats = _time_calls(full, frames)
+    for line in lines: line.set_animated(True)
+    canvas.draw()
+    backgrounds = [canvas.copy_from_bbox(ax.bbox) for ax in axs.flat]
+
+    def blit():
+        update()
+        for ax, line, bg in zip(axs.flat, lines, backgrounds):
+            canvas.restore_region(bg)
+            ax.draw_artist(line)
+            canvas.blit(ax.bbox)
+
+    return {'full_draw': full_stats, 'blit': _time_calls(blit, frames)}
+
+def bench_suite(points=1601, ifbw=50e3, duration=3.0, latency=0.0, sweep_time=None, json_path=None):
+    """
+    Sahte sunucu üzerinde uçtan uca ölçüm: bağlantı, sorgu gecikmesi, ayrıştırma,
+    çerçeve toplama, çizim ve tarama/s. Sonuçlar JSON olarak yazdırılır/kaydedilir.
+    """
+    import json
+    import platform
+    quiet = lambda msg, type=None: None
+    server = MockVNAServer(latency=latency, sweep_time=sweep_time)
+    host, port = server.start()
+    results = {'meta': {'timestamp': datetime.now().isoformat(timespec='seconds'), 'points': points, 'ifbw': ifbw,
+                        'latency_s': latency, 'sweep_time_s': sweep_time, 'python': platform.python_version(),
+                        'numpy': np.__version__, 'platform': platform.platform()}}
+
+    def connect_once():
+        c = VNAClient(log_callback=quiet)
+        c.connect(host, port)
+        c.disconnect()
+    results['connect'] = _time_calls(connect_once, 20)
+
+    client = VNAClient(log_callback=quiet)
+    client.connect(host, port)
+    configure_sweep(client, 100e3, 6e9, points, ifbw)
+    results['query_latency'] = _time_calls(lambda: client.query("*IDN?"), 200)
+
+    payload = server.sweep_payload('S11')
+    results['payload_bytes'] = len(payload)
+    results['parse'] = _time_calls(lambda: parse_trace_data(payload), 50)
+    results['frame_fetch'] = _time_calls(lambda: client.get_traces(TRACE_PARAMS), 30)
+    results['render'] = _bench_render(points)
+    results['render_lod'] = {n: _bench_render(n, frames=20, lod=True)['blit'] for n in (201, 1601, 10001, 100001)} \
+        if results['render'] else None
+
+    results['sweep_time_s'] = server.current_sweep_time()
+    worker = AcquisitionWorker(client, None, SweepScheduler(points, ifbw))
+    count = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < duration:
+        if worker.next_frame() is None: break
+        count += 1
+    elapsed = time.perf_counter() - t0
+    results['end_to_end'] = {'sweeps': count, 'seconds': elapsed, 'sweeps_per_s': count / elapsed,
+                             'wasted_fetches': worker.scheduler.wasted}
+    worker.shutdown()
+    server.stop()
+
+    text = json.dumps(results, indent=2)
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    print(text)
+    return results
+
+def bench_reconnect(points=1601, ifbw=50e3, duration=10.0, drop_every=1.0, stall_every=None):
+    """
+    Sahte sunucuda bağlantıyı periyodik olarak keserek (ve isteğe bağlı cevapları
+    bekleterek) akışı sürdürür; kopmadan ilk yeni taramaya kadar geçen süreyi ölçer.
+    """
+    import json
+    server = MockVNAServer()
+    host, port = server.start()
+    client = VNAClient(log_callback=lambda msg, type=None: None)
+    client.connect(host, port)
+    configure_sweep(client, 100e3, 6e9, points, ifbw)
+    worker = AcquisitionWorker(client, None, SweepScheduler(points, ifbw))
+
+    stop = threading.Event()
+    def inject():
+        next_drop, next_stall = drop_every, stall_every
+        t0 = time.perf_counter()
+        while not stop.wait(0.01):
+            t = time.perf_counter() - t0
+            if drop_every and t >= next_drop:
+                server.drop_connections()
+                next_drop += drop_every
+            if stall_every and t >= next_stall:
+                server.stall(0.3)
+                next_stall += stall_every
+    injector = threading.Thread(target=inject, daemon=True)
+
+    count = 0
+    injector.start()
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < duration:
+        if worker.next_frame() is None: break
+        count += 1
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    worker.shutdown()
+    server.stop()
+
+    results = {'sweeps': count, 'seconds': elapsed, 'sweeps_per_s': count / elapsed,
+               'reconnects': client.reconnects, 'latency_ms': (client.latency or 0.0) * 1e3,
+               'state_mirror': {'sent': client.state.sent, 'skipped': client.state.skipped,
+                                'restarts_avoided': client.state.restarts_avoided},
+               'io_timeout_ms': client.io_timeout() * 1e3,
+               'recovery': _timing_summary(worker.recovery_times) if worker.recovery_times else None}
+    print(json.dumps(results, indent=2))
+    return results
+
+BENCH_SEGMENTS = ("100 kHz, 1.9 GHz, 201, 50 kHz\n"
+                  "1.9 GHz, 2.1 GHz, 401, 10 kHz\n"
+                  "2.1 GHz, 6 GHz, 201, 50 kHz\n")
+
+def bench_segments(duration=3.0, latency=0.0):
+    """
+    Sahte sunucuda 2 GHz'lik dar bir geçiş bandını ince, geri kalanı kaba
+    segmentle tarar; ölçülen birleşik tarama süresini tahminle ve aynı
+    çözünürlükteki tek taramanın tahmini süresiyle karşılaştırır.
+    """
+    import json
+    plan = SegmentPlan.from_lines(BENCH_SEGMENTS.splitlines())
+    server = MockVNAServer(latency=latency, f0=2e9)
+    host, port = server.start()
+    client = VNAClient(log_callback=lambda msg, type=None: None)
+    client.connect(host, port)
+    worker = AcquisitionWorker(client, None, plan.make_scheduler(), segments=plan)
+
+    times, frame = [], None
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < duration:
+        t = time.perf_counter()
+        frame = worker.next_frame()
+        if frame is None: break
+        times.append(time.perf_counter() - t)
+    worker.shutdown()
+    server.stop()
+
+    freqs = frame['S21'][0] if frame else np.empty(0)
+    points, ifbw, t_single = plan.single_sweep_equivalent()
+    results = {'segments': len(plan.segments), 'points': int(freqs.size),
+               'sorted_unique': bool(freqs.size and np.all(np.diff(freqs) > 0)),
+               'estimate_ms': plan.estimate_time() * 1e3, 'sweep': _timing_summary(times) if times else None,
+               'single_sweep': {'points': points, 'ifbw': ifbw, 'estimate_ms': t_single * 1e3},
+               'speedup_estimate': t_single / plan.estimate_time(), 'stitch_builds': plan.builds}
+    print(json.dumps(results, indent=2))
+    return results
+
+def startup_probe():
+    """
+    Bu süreçte açılış aşamalarını ölçer (ms, STARTUP_T0'dan itibaren). Ekran
+    varsa gerçek pencere açılır; yoksa pencere atlanır, figür Agg ile çizilir.
+    """
+    result = {'import': (time.perf_counter() - STARTUP_T0) * 1e3}
+    load_gui_modules()
+    result['tk_import'] = (time.perf_counter() - STARTUP_T0) * 1e3
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        root = None
+    if root is not None:
+        app = VNAApp(root)
+        while app.canvas is None:
+            root.update()
+        result.update(app.startup)
+        root.destroy()
+        return result
+    t0 = time.perf_counter()
+    load_plot_modules()
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    result['plot_import'] = (time.perf_counter() - t0) * 1e3
+    fig, axs = make_plot_figure()
+    canvas = FigureCanvasAgg(fig)
+    for p in TRACE_PARAMS:
+        if p in ('S11', 'S22'):
+            draw_smith_background(axs[TRACE_AXES[p]])
+    canvas.draw()
+    result['first_frame'] = (time.perf_counter() - STARTUP_T0) * 1e3
+    return result
+
+def bench_startup(runs=3):
+    """Soğuk açılış: her ölçüm ayrı süreçte (modüller önbelleğe alınmadan) yapılır."""
+    import json
+    import subprocess
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "bench", "startup", "--child"],
+                             capture_output=True, text=True, check=True).stdout
+        sample = json.loads(out.strip().splitlines()[-1])
+        sample['process'] = (time.perf_counter() - t0) * 1e3 # Yorumlayıcı başlatma dahil
+        samples.append(sample)
+    results = {key: float(np.median([s[key] for s in samples])) for key in samples[0]}
+    results['runs'] = runs
+    results['window'] = results.get('window') # Ekran yoksa None
+    print(json.dumps(results, indent=2))
+    return results
+
+def run_mock_server(args):
+    server = MockVNAServer(args.host, args.port, args.latency, args.bandwidth, args.sweep_time)
+    host, port = server.start()
+    print(f"Sahte LibreVNA dinliyor: {host}:{port} (Ctrl+C ile çık)", file=sys.stderr)
+    try:
+        last_drop = time.monotonic()
+        while True:
+            time.sleep(0.1 if args.drop_every else 1)
+            if args.drop_every and time.monotonic() - last_drop >= args.drop_every:
+                server.drop_connections()
+                last_drop = time.monotonic()
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+# --- KOMUT SATIRI (ARAYÜZSÜZ) ---
+
+def _write_stdout_sweep(out, index, frame, header, instrument=False):
+    # Tek akış: her satır (cihaz,) tarama numarası ve zaman damgasıyla başlar
+    lead = ["Instrument"] if instrument else []
+    if header:
+        out.write(",".join(lead + ["Sweep", "Timestamp"] + CSV_HEADER) + "\n")
+    freqs, traces = sweep_from_data(frame)
+    table = _sweep_to_table(freqs, traces)
+    prefix = f"{frame['instrument']}," if instrument else ""
+    prefix += f"{index},{frame['timestamp']:.6f},"
+    out.write("".join(prefix + ",".join(map(repr, row)) + "\n" for row in table.tolist()))
+
+def _sweep_settings(args):
+    start, stop = parse_frequency(args.start), parse_frequency(args.stop)
+    if not (start and stop): return None
+    return dict(start=start, stop=stop, points=args.points, ifbw=parse_frequency(args.ifbw),
+                avg=args.avg, sweep_type=args.sweep_type, power=args.power)
+
+def _cli_log(msg, type=None):
+    """Komut satırı kaydı: türü verilen iletiler arayüzdeki gibi zaman damgalı yazılır."""
+    if type:
+        msg = f"[{datetime.now().strftime('%H:%M:%S')}] [{type}] {msg}"
+    print(msg, file=sys.stderr)
+
+def run_headless(args):
+    """Arayüz olmadan taramayı ayarlar, N tarama ya da T saniye boyunca veri toplar."""
+    log = _cli_log
+    settings = _sweep_settings(args)
+    if not settings:
+        log("Frekans hatası")
+        return 2
+
+    plan = None
+    if args.limits:
+        try:
+            plan = TestPlan.load(args.limits)
+        except (OSError, ValueError) as e:
+            log(f"Test tanımı hatası: {e}")
+            return 2
+    segments = None
+    if args.segments:
+        try:
+            segments = SegmentPlan.load(args.segments)
+        except (OSError, ValueError) as e:
+            log(f"Segment tanımı hatası: {e}")
+            return 2
+        segments.avg, segments.sweep_type, segments.power = args.avg, args.sweep_type, args.power
+        log(f"Segmentli tarama: {segments.report()}")
+
+    client = VNAClient(log_callback=log)
+    if not client.connect(args.ip, args.port):
+        return 1
+    if not segments:
+        configure_sweep(client, **settings)
+
+    tester = TestSession(plan, args.results) if plan else None
+    out = args.output
+    recorder = SweepRecorder(out) if out.endswith(".vnarec") else None
+    stats = SweepStats() if args.stats else None
+    scheduler = segments.make_scheduler() if segments else SweepScheduler(args.points, settings['ifbw'])
+    worker = AcquisitionWorker(client, None, scheduler, recorder, stats, tester, segments=segments)
+
+    count = 0
+    t0 = time.perf_counter()
+    # Süre dolunca next_frame bekleme/yeniden bağlanma ortasında da durur
+    deadline = threading.Timer(args.duration, worker.stop) if args.duration else None
+    if deadline:
+        deadline.daemon = True
+        deadline.start()
+    try:
+        while args.sweeps is None or count < args.sweeps:
+            frame = worker.next_frame()
+            if frame is None: break
+            if out == "-":
+                _write_stdout_sweep(sys.stdout, count, frame, header=(count == 0))
+            elif not recorder:
+                base, ext = os.path.splitext(out)
+                write_sweep_file(f"{base}_{count:04d}{ext}", *sweep_from_data(frame))
+            count += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.perf_counter() - t0
+        if deadline:
+            deadline.cancel()
+        worker.shutdown()
+        sys.stdout.flush()
+
+    rate = count / elapsed if elapsed > 0 else 0.0
+    log(f"{count} tarama, {elapsed:.2f} s, {rate:.2f} tarama/s (boşa çekim: {worker.scheduler.wasted})")
+    log(f"Ayar aynası: {client.state.report()}")
+    if stats and stats.count:
+        write_stats_csv(args.stats, *stats.snapshot())
+        log(f"İstatistikler kaydedildi: {args.stats} ({stats.count} tarama)")
+    if PROBES.enabled:
+        log(PROBES.format_summary())
+    if tester and tester.failed:
+        return 3 # Üretim testi: en az bir tarama limitleri aştı
+    return 0
+
+def run_pool(args):
+    """Birden çok cihazdan eşzamanlı tarama toplar; her tarama cihaz kimliğiyle etiketlenir."""
+    log = _cli_log
+    settings = _sweep_settings(args)
+    if not settings:
+        log("Frekans hatası")
+        return 2
+
+    out = args.output
+    base, ext = os.path.splitext(out)
+    safe_id = lambda instrument_id: instrument_id.replace(':', '_')
+    recorder_factory = None
+    if ext == ".vnarec":
+        recorder_factory = lambda instrument_id: SweepRecorder(f"{base}_{safe_id(instrument_id)}{ext}")
+
+    pool = InstrumentPool(args.endpoints, log_callback=log)
+    # Cihazlar arka planda bağlanır; hazır olanların çerçeveleri hemen tüketilir
+    pool.start(settings, recorder_factory)
+
+    counts = {}
+    t0 = time.perf_counter()
+    deadline = t0 + args.duration if args.duration else None
+    header = True
+    try:
+        while pool.alive():
+            if deadline and time.perf_counter() >= deadline: break
+            if args.sweeps is not None and not pool.connecting and \
+                    all(counts.get(i, 0) >= args.sweeps for i in pool.started()): break
+            frame = pool.get(timeout=0.1)
+            if frame is None: continue
+            instrument_id = frame['instrument']
+            index = counts.get(instrument_id, 0)
+            if args.sweeps is not None and index >= args.sweeps: continue
+            if out == "-":
+                _write_stdout_sweep(sys.stdout, index, frame, header, instrument=True)
+                header = False
+            elif not recorder_factory:
+                write_sweep_file(f"{base}_{safe_id(instrument_id)}_{index:04d}{ext}", *sweep_from_data(frame))
+            counts[instrument_id] = index + 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.perf_counter() - t0
+        pool.stop()
+        sys.stdout.flush()
+
+    if not pool.started():
+        log("Hiçbir cihaza bağlanılamadı")
+        return 1
+    for instrument_id in pool.started():
+        count = counts.get(instrument_id, 0)
+        log(f"{instrument_id}: {count} tarama, {count / elapsed:.2f} tarama/s")
+    total = sum(counts.values())
+    log(f"Toplam: {total} tarama, {elapsed:.2f} s, {total / elapsed:.2f} tarama/s (atılan: {pool.dropped})")
+    if PROBES.enabled:
+        log(PROBES.format_summary())
+    return 0
+
+def run_batch(args):
+    """Kayıtlı CSV/.s2p dosyalarını toplu işler ve tek özet tablosu yazar."""
+    log = lambda msg: print(msg, file=sys.stderr)
+    plan, plan_digest = None, None
+    if args.limits:
+        try:
+            plan = TestPlan.load(args.limits)
+            plan_digest = file_digest(args.limits)
+        except (OSError, ValueError) as e:
+            log(f"Test tanımı hatası: {e}")
+            return 2
+    files = expand_batch_inputs(args.inputs, exclude=[args.output])
+    if not files:
+        log("İşlenecek dosya bulunamadı")
+        return 2
+    if args.touchstone:
+        os.makedirs(args.touchstone, exist_ok=True)
+
+    cache = None
+    if not args.no_cache:
+        config = {'limits': plan_digest, 'touchstone': args.touchstone and os.path.abspath(args.touchstone),
+                  'format': args.format}
+        cache_dir = os.path.dirname(os.path.abspath(args.output))
+        cache = BatchCache(os.path.join(cache_dir, BATCH_CACHE_NAME), config)
+
+    t0 = time.perf_counter()
+    rows, errors = process_batch(files, plan, args.touchstone, args.format, args.jobs, cache, log)
+    elapsed = time.perf_counter() - t0
+    write_batch_summary(args.output, files, rows, errors)
+    if cache:
+        cache.save()
+
+    hits = cache.hits if cache else 0
+    processed = len(files) - hits
+    failed = sum(1 for row in rows.values() if row['result'] is False)
+    log(f"{len(files)} dosya: {processed} işlendi, {hits} önbellekten, {len(errors)} hata"
+        + (f", {failed} KALDI" if plan else "")
+        + f" | {elapsed:.2f} s ({processed / elapsed if elapsed > 0 else 0:.1f} dosya/s) -> {args.output}")
+    if failed: return 3
+    return 1 if errors else 0
+
+def _add_sweep_args(parser):
+    parser.add_argument("--start", default="100 kHz")
+    parser.add_argument("--stop", default="6 GHz")
+    parser.add_argument("--points", type=int, default=201)
+    parser.add_argument("--ifbw", default="1 kHz")
+    parser.add_argument("--avg", type=int, default=1)
+    parser.add_argument("--sweep-type", default="LIN", choices=["LIN", "LOG"])
+    parser.add_argument("--power", type=float, default=0.0, help="dBm")
+    limit = parser.add_mutually_exclusive_group()
+    limit.add_argument("-n", "--sweeps", type=int, help="Toplanacak tarama sayısı (cihaz başına)")
+    limit.add_argument("-t", "--duration", type=float, help="Toplama süresi (s)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="'-' = stdout CSV, .vnarec = ikili kayıt, .csv/.s2p = tarama başına dosya")
+    parser.add_argument("--perf", action="store_true", help="Aşama sürelerini ölç ve sonunda yazdır")
+
+def build_arg_parser():
+    import argparse
+    parser = argparse.ArgumentParser(description="LibreVNA SCPI aracı (argümansız çalıştırılırsa arayüz açılır)")
+    sub = parser.add_subparsers(dest="command")
+
+    acq = sub.add_parser("acquire", help="Arayüzsüz tarama toplama")
+    acq.add_argument("--ip", default="192.168.1.107")
+    acq.add_argument("--port", type=int, default=DEFAULT_PORT)
+    acq.add_argument("--stats", help="S12/S21 tarama istatistiklerinin yazılacağı CSV dosyası")
+    acq.add_argument("--limits", help="Limit/işaretçi tanım dosyası; herhangi bir tarama kalırsa çıkış kodu 3")
+    acq.add_argument("--results", help="--limits ile: tarama başına sonuç günlüğü (CSV)")
+    acq.add_argument("--segments", help="Segment tablosu (start, stop, points, ifbw [, güç]); --start/--stop/--points/--ifbw yerine")
+    _add_sweep_args(acq)
+
+    pool = sub.add_parser("pool", help="Birden çok cihazdan eşzamanlı tarama toplama")
+    pool.add_argument("endpoints", nargs="+", help="ip[:port] listesi")
+    _add_sweep_args(pool)
+
+    batch = sub.add_parser("batch", help="Kayıtlı CSV/.s2p dosyalarını toplu işleme ve özet tablosu")
+    batch.add_argument("inputs", nargs="+", help="Dizin veya glob deseni (ör. 'lot42/*.csv')")
+    batch.add_argument("-o", "--output", default="batch_summary.csv", help="Özet tablosu (CSV)")
+    batch.add_argument("-j", "--jobs", type=int, help="Süreç sayısı (varsayılan: çekirdek sayısı)")
+    batch.add_argument("--limits", help="Limit/işaretçi tanım dosyası; herhangi bir dosya kalırsa çıkış kodu 3")
+    batch.add_argument("--touchstone", metavar="DIR", help="Her dosyayı bu dizine .s2p olarak da yaz")
+    batch.add_argument("--format", default="RI", choices=["RI", "MA", "DB"], help="--touchstone biçimi")
+    batch.add_argument("--no-cache", action="store_true", help="Önbelleği kullanma; tüm dosyaları yeniden işle")
+
+    bench = sub.add_parser("bench", help="Performans ölçümleri")
+    bench.add_argument("name", choices=["parse", "recv", "io", "stats", "derived", "reconnect", "segments", "startup", "suite"])
+    bench.add_argument("--points", type=int, default=1601, help="suite: nokta sayısı")
+    bench.add_argument("--ifbw", type=float, default=50e3, help="suite: IFBW (Hz)")
+    bench.add_argument("--duration", type=float, default=3.0, help="suite: uçtan uca ölçüm süresi (s)")
+    bench.add_argument("--latency", type=float, default=0.0, help="suite: sahte sunucu cevap gecikmesi (s)")
+    bench.add_argument("--sweep-time", type=float, help="suite: sahte tarama süresi (s); verilmezse nokta/IFBW'den")
+    bench.add_argument("--json", help="suite: sonuçların yazılacağı JSON dosyası")
+    bench.add_argument("--drop-every", type=float, default=1.0, help="reconnect: bağlantı kesme aralığı (s)")
+    bench.add_argument("--stall-every", type=float, help="reconnect: cevapları 0.3 s bekletme aralığı (s)")
+    bench.add_argument("--child", action="store_true", help=argparse.SUPPRESS) # startup: ölçüm süreci
+
+    mock = sub.add_parser("mock", help="Sahte LibreVNA SCPI sunucusu")
+    mock.add_argument("--host", default="127.0.0.1")
+    mock.add_argument("--port", type=int, default=DEFAULT_PORT)
+    mock.add_argument("--latency", type=float, default=0.0, help="Cevap başına gecikme (s)")
+    mock.add_argument("--bandwidth", type=float, help="Bayt/s sınırı")
+    mock.add_argument("--sweep-time", type=float, help="Tarama süresi (s); verilmezse nokta/IFBW'den")
+    mock.add_argument("--drop-every", type=float, help="Bağlantıları bu aralıkla (s) kes")
+    return parser
+
+def run_gui():
+    load_gui_modules()
     root = tk.Tk()
     try:
         from ctypes import windll
@@ -570,4 +3954,41 @@ if __name__ == "__main__":
     except:
         pass
     app = VNAApp(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    PROBES.enabled = getattr(args, 'perf', False)
+    if args.command == "acquire":
+        if args.sweeps is None and args.duration is None:
+            args.sweeps = 1
+        return run_headless(args)
+    if args.command == "pool":
+        if args.sweeps is None and args.duration is None:
+            args.sweeps = 1
+        return run_pool(args)
+    if args.command == "batch":
+        return run_batch(args)
+    if args.command == "bench":
+        if args.name == "suite":
+            bench_suite(args.points, args.ifbw, args.duration, args.latency, args.sweep_time, args.json)
+        elif args.name == "reconnect":
+            bench_reconnect(args.points, args.ifbw, args.duration, args.drop_every, args.stall_every)
+        elif args.name == "segments":
+            bench_segments(args.duration, args.latency)
+        elif args.name == "startup":
+            if args.child:
+                import json
+                print(json.dumps(startup_probe()))
+            else:
+                bench_startup()
+        else:
+            {"parse": bench_parse, "recv": bench_recv, "io": bench_io, "stats": bench_stats, "derived": bench_derived}[args.name]()
+        return 0
+    if args.command == "mock":
+        return run_mock_server(args)
+    run_gui()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())